@@ -3,7 +3,6 @@ import websockets
 import base64
 import wave
 import os
-import re
 import json
 import time
 import torch
@@ -12,20 +11,70 @@ from flask import Flask, send_from_directory
 from threading import Thread
 import io
 import onnx_asr
-import aiohttp  # Changed for async HTTP requests
 import notes_manager
-from json_repair import repair_json
+from llm_client import OllamaClient
+from llm_cache import ResponseCache, normalize_prompt
+from llm_dispatcher import LlmDispatcher
+from llm_pool import EndpointPool
+from llm_resilience import CircuitBreaker
+from intent_classifier import IntentClassifier
+from command_matcher import CommandMatcher, PhraseAutomaton, strip_spans
+from vad_scheduler import VadScheduler
+from inference_executor import InferenceExecutor
+from asr_batcher import AsrBatcher
+from audio_ring import UtteranceBuffer
+from response_parser import PARSE_TIER_COUNTS, parse_ai_json
 import logging
 from datetime import datetime
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from collections import defaultdict
 import uuid
 
 # === Configuration ===
 API_URL = "http://103.102.234.6:11434/api/generate"
+API_URLS = [API_URL]  # Add more Ollama hosts to spread classification over them
+LLM_MAX_FAILURES = 3          # Consecutive errors before an endpoint is ejected
+LLM_EJECTION_S = 10.0         # First ejection; doubles on repeats (up to LLM_MAX_EJECTION_S)
+LLM_MAX_EJECTION_S = 300.0
+LLM_SLOW_FACTOR = 3.0         # Eject an endpoint this many times slower than its peers
+LLM_HEALTH_INTERVAL_S = 5.0   # Active GET /api/tags probe of every endpoint
+LLM_RETRIES = 2               # Extra attempts after a timeout/5xx/stall, within LLM_DEADLINE_S
+LLM_RETRY_BASE_S = 0.25       # Full-jitter exponential backoff between attempts
+LLM_RETRY_CAP_S = 2.0
+LLM_STALL_TIMEOUT_S = 10.0    # Give up on a streamed attempt that sends nothing for this long
+LLM_HEDGE = True              # Duplicate a slow request to a second endpoint (needs 2+ API_URLS)
+LLM_HEDGE_PERCENTILE = 95.0   # ...once it has run longer than this percentile of recent requests
+LLM_BREAKER_FAILURES = 3      # Failed requests in a row that open the circuit
+LLM_BREAKER_RESET_S = 15.0    # How long the circuit stays open before a trial request
+LLM_FALLBACK_TO_RULES = True  # Classify with the local rules when the LLM is unavailable
+OLLAMA_MODEL = "gemma3:latest"
+OLLAMA_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "max_tokens": 500
+}
+LLM_TIMEOUT_S = 30.0
+LLM_CONNECT_TIMEOUT_S = 5.0
+LLM_MAX_CONNECTIONS_PER_HOST = 16
+LLM_KEEPALIVE_S = 60.0
+LLM_MAX_IN_FLIGHT = 4      # Requests per Ollama endpoint at once; the rest queue fairly per session
+LLM_DEADLINE_S = 30.0      # From submit; queued requests that can't finish by then are dropped early
+LLM_CHAT_API = True        # /api/chat with SYSTEM_PROMPT as the system message (False: /api/generate + system)
+LLM_KEEP_ALIVE = "30m"     # Keep the model and its cached prompt prefix loaded between commands
+LLM_WARMUP = True          # Evaluate SYSTEM_PROMPT on every endpoint at startup
+LLM_STREAMING = True  # Stream tokens and forward intent/context/action as soon as they complete
+EARLY_FIELDS = ("intent", "context", "action")
+RULE_CLASSIFIER = True              # Try the local rule-based classifier before the LLM
+RULE_CONFIDENCE_THRESHOLD = 0.85    # Below this the command goes to the LLM
+SPECULATIVE_LLM = False             # Classify the transcript when each utterance ends, before the confirm phrase
 OUTPUT_DIR = "output_files"
+ARCHIVE_AUDIO = False  # Also write each utterance to OUTPUT_DIR as a WAV, off the critical path
 CACHE_DIR = "cache"
+LLM_CACHE = True                 # Answer repeated commands (same normalized prompt/model/options) from a cache
+LLM_CACHE_MAX_ENTRIES = 1024
+LLM_CACHE_TTL_S = 24 * 3600.0
+LLM_CACHE_PERSIST = True         # Keep cached responses in CACHE_DIR across restarts
 LOG_DIR = "logs"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(CACHE_DIR, exist_ok=True)
@@ -47,32 +96,92 @@ logger = logging.getLogger(__name__)
 class SessionData:
     """Store session-specific data"""
     session_id: str
-    audio_buffer: bytearray = None
+    audio_buffer: UtteranceBuffer = None
+    vad_frames: Optional[np.ndarray] = None   # float32 frames of the message being scored, reused
     silent_frame_count: int = 0
     speech_frame_count: int = 0
     is_speaking: bool = False
     transcriptions: List[str] = None
     last_activity: float = None
     processing_task: Optional[asyncio.Task] = None
+    # Streaming partials: audio before committed_bytes is already transcribed
+    partial_task: Optional[asyncio.Task] = None
+    committed_text: List[str] = None
+    committed_bytes: int = 0
+    last_pause_offset: int = 0
+    frames_since_partial: int = 0
+    command_matcher: Optional[CommandMatcher] = None
+    # (normalized transcript, LLM call) started before the confirm phrase arrived
+    speculation: Optional[Tuple[str, asyncio.Task]] = None
 
     def __post_init__(self):
         if self.audio_buffer is None:
-            self.audio_buffer = bytearray()
+            self.audio_buffer = UtteranceBuffer(MAX_UTTERANCE_SAMPLES, PRE_ROLL_SAMPLES)
         if self.transcriptions is None:
             self.transcriptions = []
+        if self.committed_text is None:
+            self.committed_text = []
+        if self.command_matcher is None:
+            self.command_matcher = CommandMatcher(COMMAND_AUTOMATON)
         if self.last_activity is None:
             self.last_activity = time.time()
 
 # === Global State ===
 sessions: Dict[str, SessionData] = {}
+background_tasks: set = set()  # Strong refs so fire-and-forget tasks aren't collected
+SPECULATION_STATS = {"started": 0, "cancelled": 0, "reused": 0, "discarded": 0}
 MODEL = None
 VAD_MODEL = None
+VAD_SCHEDULER: Optional[VadScheduler] = None
+INFERENCE: Optional[InferenceExecutor] = None
+ASR_BATCHER: Optional[AsrBatcher] = None
+LLM_CLIENT: Optional[OllamaClient] = None
+LLM_RESPONSE_CACHE: Optional[ResponseCache] = None
+LLM_DISPATCHER: Optional[LlmDispatcher] = None
+LLM_POOL: Optional[EndpointPool] = None
+INTENT_RULES = IntentClassifier(threshold=RULE_CONFIDENCE_THRESHOLD)
 VAD_THRESHOLD = 0.5
 SAMPLE_RATE = 16000
 FRAME_SIZE_SAMPLES = 512
 CHUNK_SIZE = FRAME_SIZE_SAMPLES * 2
 PAUSE_THRESHOLD_FRAMES = 60
 MIN_SPEECH_FRAMES = 60
+PRE_ROLL_FRAMES = 10            # ~320 ms kept from before the first speech frame
+MAX_UTTERANCE_SECONDS = 30.0    # Utterances are cut here even if the speaker hasn't paused
+PRE_ROLL_SAMPLES = PRE_ROLL_FRAMES * FRAME_SIZE_SAMPLES
+MAX_UTTERANCE_SAMPLES = int(MAX_UTTERANCE_SECONDS * SAMPLE_RATE) // FRAME_SIZE_SAMPLES * FRAME_SIZE_SAMPLES
+
+# === Command Phrases ===
+COMMAND_PHRASES = [
+    "confirm and submit",
+    "process notes",
+    "save that",
+    "add to notes"
+]
+# Trigger-only phrases removed from the text sent for classification;
+# "add to notes" stays because it carries routing meaning
+STRIP_COMMAND_PHRASES = {"confirm and submit", "process notes", "save that"}
+COMMAND_AUTOMATON = PhraseAutomaton(COMMAND_PHRASES)
+
+# === Streaming Partial Transcripts ===
+STREAMING_PARTIALS = True
+PARTIAL_INTERVAL_FRAMES = 10   # ~320 ms between partial decodes while speaking
+PARTIAL_COMMIT_SECONDS = 8.0   # Freeze uncommitted audio longer than this at the last silent frame
+PARTIAL_COMMIT_BYTES = int(PARTIAL_COMMIT_SECONDS * SAMPLE_RATE) * 2
+VAD_MAX_BATCH_SIZE = 128  # Frames scored per batched VAD forward pass
+VAD_MAX_WAIT_MS = 5.0     # Max time a frame waits for other sessions' frames
+
+# === Inference Executor Configuration ===
+ASR_MODEL_NAME = "nemo-parakeet-tdt-0.6b-v3"
+ASR_EXECUTOR = "thread"   # "thread" shares one model, "process" loads one per worker
+ASR_WORKERS = 1
+ASR_MAX_PENDING = 8       # Utterances queued or running before callers wait
+VAD_EXECUTOR_THREADS = 1
+
+# === ASR Batching Configuration ===
+ASR_MAX_BATCH_SIZE = 8    # Utterances per batched recognize() call
+ASR_MAX_WAIT_MS = 50.0    # Max time a ready utterance waits for others
+ASR_BUCKET_RATIO = 1.5    # Longest/shortest waveform allowed in one batch
 
 # === Flask App for Status Endpoint ===
 app = Flask(__name__)
@@ -80,11 +189,44 @@ app = Flask(__name__)
 @app.route('/status')
 def status():
     """Health check endpoint"""
-    return {
+    status_data = {
         'status': 'running',
         'sessions': len(sessions),
         'timestamp': datetime.now().isoformat()
     }
+    if VAD_SCHEDULER is not None:
+        status_data['vad'] = {
+            'frames': VAD_SCHEDULER.frames_processed,
+            'batches': VAD_SCHEDULER.batches_processed,
+            'avg_batch_size': round(VAD_SCHEDULER.average_batch_size, 2)
+        }
+    if INFERENCE is not None:
+        status_data['asr'] = {
+            'mode': INFERENCE.asr_mode,
+            'pending': INFERENCE.asr_pending,
+            'completed': INFERENCE.asr_completed
+        }
+    status_data['intent_rules'] = INTENT_RULES.stats()
+    status_data['json_parse'] = dict(PARSE_TIER_COUNTS)
+    if SPECULATIVE_LLM:
+        status_data['speculation'] = dict(SPECULATION_STATS)
+    if LLM_RESPONSE_CACHE is not None:
+        status_data['llm_cache'] = LLM_RESPONSE_CACHE.stats()
+    if LLM_DISPATCHER is not None:
+        status_data['llm_queue'] = LLM_DISPATCHER.stats()
+    if LLM_POOL is not None:
+        status_data['llm_endpoints'] = LLM_POOL.stats()
+    if LLM_CLIENT is not None:
+        status_data['llm_requests'] = LLM_CLIENT.stats()
+    status_data['notes'] = {
+        'writes': dict(notes_manager.WRITE_STATS),
+        'cache': notes_manager.DOC_CACHE.stats()
+    }
+    if ASR_BATCHER is not None:
+        status_data['asr']['utterances'] = ASR_BATCHER.utterances
+        status_data['asr']['avg_batch_size'] = round(ASR_BATCHER.average_batch_size, 2)
+        status_data['asr']['padding_waste'] = round(ASR_BATCHER.padding_waste, 3)
+    return status_data
 
 @app.route('/logs')
 def get_logs():
@@ -106,9 +248,12 @@ async def load_models():
     global MODEL, VAD_MODEL
 
     try:
-        logger.info("Loading ASR model...")
-        MODEL = onnx_asr.load_model("nemo-parakeet-tdt-0.6b-v3")
-        logger.info("ASR model loaded successfully")
+        if ASR_EXECUTOR == "thread":
+            logger.info("Loading ASR model...")
+            MODEL = onnx_asr.load_model(ASR_MODEL_NAME)
+            logger.info("ASR model loaded successfully")
+        else:
+            logger.info("ASR model will be loaded by the worker processes")
 
         logger.info("Loading Silero VAD model...")
         torch.backends.nnpack.enabled = False
@@ -127,51 +272,22 @@ async def load_models():
         raise
 
 # === Async AI Query ===
-async def query_ai_async(prompt: str, session_id: str) -> Dict[str, Any]:
-    """Make async API call to AI model"""
-    async with aiohttp.ClientSession() as session:
-        payload = {
-            "model": "gemma3:latest",
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "max_tokens": 500
-            }
+async def query_ai_async(prompt: str, session_id: str, on_field=None, on_queued=None) -> Dict[str, Any]:
+    """Make async API call to AI model over the shared connection pool (queued by LLM_DISPATCHER)"""
+    if LLM_CLIENT is None:
+        return {
+            'success': False,
+            'error': "AI client not started",
+            'session_id': session_id
         }
-
-        try:
-            async with session.post(API_URL, json=payload, timeout=30) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {
-                        'success': True,
-                        'response': data.get("response", ""),
-                        'session_id': session_id
-                    }
-                else:
-                    error_text = await response.text()
-                    return {
-                        'success': False,
-                        'error': f"HTTP {response.status}: {error_text}",
-                        'session_id': session_id
-                    }
-        except asyncio.TimeoutError:
-            return {
-                'success': False,
-                'error': "AI query timeout",
-                'session_id': session_id
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"AI query failed: {str(e)}",
-                'session_id': session_id
-            }
+    deadline = asyncio.get_running_loop().time() + LLM_DEADLINE_S
+    return await LLM_CLIENT.generate(prompt, session_id, on_field=on_field,
+                                     deadline=deadline, on_queued=on_queued)
 
 # === Enhanced Prompt Template ===
-PROMPT_TEMPLATE = """
+# The fixed instructions go to Ollama as the system prompt so every request
+# shares the same prefix; only PROMPT_TEMPLATE carries the user's text.
+SYSTEM_PROMPT = """
 You are a text intent and context classifier for a personal note manager.
 
 Analyze the user's instruction and produce structured JSON with these fields:
@@ -190,100 +306,295 @@ Rules for text formatting:
 - Add timestamps if time-sensitive
 
 Example output format:
-{{
+{
   "intent": "take_notes",
   "context": "linux",
   "action": "insert",
   "text": ["chmod command usage and syntax"],
-  "metadata": {{"tags": ["commands", "permissions"]}},
+  "metadata": {"tags": ["commands", "permissions"]},
   "confidence": 0.95
-}}
+}
+"""
 
-Now analyze: "{text}"
+PROMPT_TEMPLATE = """Now analyze: "{text}"
 
 Return ONLY valid JSON:
 """
 
 # === Audio Processing ===
+def pcm16_to_float32(audio_bytes, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert 16-bit PCM to a float32 waveform in [-1, 1) with a single allocation, or none given out"""
+    pcm = np.frombuffer(audio_bytes, dtype=np.int16)  # zero-copy view
+    return np.multiply(pcm, 1.0 / 32768.0, out=out, dtype=np.float32)
+
+def message_frames(session: SessionData, message: bytes) -> np.ndarray:
+    """A whole message as (n_frames, FRAME_SIZE_SAMPLES) float32, in the session's reusable VAD buffer"""
+    n_frames = len(message) // CHUNK_SIZE
+    if session.vad_frames is None or len(session.vad_frames) < n_frames:
+        session.vad_frames = np.empty((n_frames, FRAME_SIZE_SAMPLES), dtype=np.float32)
+    frames = session.vad_frames[:n_frames]
+    pcm16_to_float32(message, out=frames.reshape(-1))
+    return frames
+
+def spawn_background(coro) -> asyncio.Task:
+    """Start a task nobody awaits, keeping it alive until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
 async def save_audio_segment(audio_bytes: bytes, sample_rate: int, session_id: str) -> str:
-    """Save audio segment to file and return path"""
+    """Archive audio segment to a WAV file and return path"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{session_id}_{timestamp}.wav"
     filepath = os.path.join(OUTPUT_DIR, filename)
 
-    with wave.open(filepath, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate)
-        wf.writeframes(audio_bytes)
+    def write_wav():
+        with wave.open(filepath, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(audio_bytes)
+
+    await asyncio.to_thread(write_wav)
 
     logger.info(f"Audio saved: {filename} for session {session_id}")
     return filepath
 
-async def transcribe_audio(filepath: str, session_id: str) -> str:
-    """Transcribe audio file using ASR model"""
+async def transcribe_audio(waveform: np.ndarray, session_id: str) -> str:
+    """Transcribe an in-memory float32 waveform using ASR model"""
     try:
-        if MODEL is None:
+        if ASR_BATCHER is None:
             raise ValueError("ASR model not loaded")
 
-        text = MODEL.recognize(filepath)
+        text = await ASR_BATCHER.transcribe(waveform)
         logger.info(f"Transcription for session {session_id}: {text[:50]}...")
-
-        # Clean up file
-        try:
-            os.remove(filepath)
-        except OSError as e:
-            logger.warning(f"Could not delete {filepath}: {e}")
-
         return text.strip()
     except Exception as e:
         logger.error(f"Transcription failed for session {session_id}: {e}")
         return ""
 
-# === JSON Processing ===
-async def process_transcription(text: str, session_id: str, websocket) -> Dict[str, Any]:
-    """Process transcription through AI and notes manager"""
+async def send_partial_transcription(session: SessionData, websocket):
+    """
+    Decode the not yet committed part of the growing utterance and push it as
+    a PARTIAL_TRANSCRIPTION. Once that part is longer than PARTIAL_COMMIT_BYTES
+    it is cut at the latest silent frame and its text is frozen, so later
+    partials and the final pass only decode the audio after it.
+    """
+    buffer = session.audio_buffer
+    utterance = buffer.utterance
+    start = session.committed_bytes
+    end = len(buffer)
+    commit = end - start >= PARTIAL_COMMIT_BYTES and session.last_pause_offset > start
+    if commit:
+        end = session.last_pause_offset
+
+    text = await transcribe_audio(
+        pcm16_to_float32(buffer.bytes_view()[start:end]), session.session_id
+    )
+
+    # The utterance ended while we were decoding; the final pass owns it now
+    if buffer.utterance != utterance:
+        return
+
+    if commit and text:
+        session.committed_text.append(text)
+        session.committed_bytes = end
+        preview = session.committed_text
+    else:
+        preview = session.committed_text + [text]
+
     try:
-        # Send immediate acknowledgment
         await websocket.send(json.dumps({
-            "type": "PROCESSING",
-            "message": "Processing your request...",
-            "session_id": session_id,
+            "type": "PARTIAL_TRANSCRIPTION",
+            "text": " ".join(t for t in preview if t),
+            "session_id": session.session_id,
             "timestamp": time.time()
         }))
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+async def transcribe_utterance(session: SessionData) -> str:
+    """Final pass at a pause: decode only the tail after the committed partials"""
+    if session.partial_task and not session.partial_task.done():
+        session.partial_task.cancel()
 
-        # Create enhanced prompt
-        prompt = PROMPT_TEMPLATE.format(text=text)
+    tail = await transcribe_audio(
+        pcm16_to_float32(session.audio_buffer.bytes_view()[session.committed_bytes:]),
+        session.session_id
+    )
+    return " ".join(t for t in session.committed_text + [tail] if t)
+
+def reset_utterance(session: SessionData):
+    """Clear per-utterance audio and streaming state"""
+    session.audio_buffer.reset()
+    session.silent_frame_count = 0
+    session.speech_frame_count = 0
+    session.partial_task = None
+    session.committed_text = []
+    session.committed_bytes = 0
+    session.last_pause_offset = 0
+    session.frames_since_partial = 0
 
-        # Async AI query
-        ai_result = await query_ai_async(prompt, session_id)
+# === JSON Processing ===
+async def classify_with_llm(text: str, session_id: str, websocket,
+                            speculative: Optional[asyncio.Task] = None) -> Dict[str, Any]:
+    """Classify a command with the LLM and parse its JSON reply, reusing a speculative call for the same text"""
+    # Create enhanced prompt
+    prompt = PROMPT_TEMPLATE.format(text=text)
+
+    # Forward early fields while the rest of the JSON is still generating
+    async def on_field(key: str, value: Any):
+        if key not in EARLY_FIELDS:
+            return
+        await websocket.send(json.dumps({
+            "type": "AI_FIELD",
+            "field": key,
+            "value": value,
+            "session_id": session_id,
+            "timestamp": time.time()
+        }))
+        if key == "context" and isinstance(value, str) and value:
+            # Resolve the notes file (and create the notes folder) ahead of the write
+            spawn_background(asyncio.to_thread(notes_manager.get_file_path, value))
 
+    # Tell the client where it stands while Ollama is busy with other sessions
+    async def on_queued(position: int, estimated_wait_s: float):
         await websocket.send(json.dumps({
-            "type": "API RESPONSE",
-            "message": ai_result,
+            "type": "QUEUED",
+            "position": position + 1,
+            "estimated_wait_s": round(estimated_wait_s, 1),
             "session_id": session_id,
             "timestamp": time.time()
         }))
 
-        if not ai_result['success']:
-            raise ValueError(ai_result.get('error', 'AI query failed'))
+    # Async AI query, unless one started before the confirm phrase already answered it
+    ai_result = None
+    if speculative is not None:
+        if not speculative.cancelled():
+            ai_result = await speculative
+        if ai_result is not None and ai_result['success']:
+            SPECULATION_STATS["reused"] += 1
+        else:
+            SPECULATION_STATS["discarded"] += 1
+    if ai_result is None or not ai_result['success']:
+        ai_result = await query_ai_async(prompt, session_id, on_field=on_field, on_queued=on_queued)
+
+    # Backend down (circuit open or every retry failed): answer from the local rules
+    if not ai_result['success'] and ai_result.get('unavailable') and LLM_FALLBACK_TO_RULES:
+        data = INTENT_RULES.classify(text)
+        if data["text"]:
+            logger.warning(f"LLM unavailable for session {session_id} ({ai_result['error']}), using rule fallback")
+            data["metadata"]["source"] = "rules_fallback"
+            await websocket.send(json.dumps({
+                "type": "API RESPONSE",
+                "message": {
+                    "success": True,
+                    "source": "rules_fallback",
+                    "response": data,
+                    "error": ai_result['error'],
+                    "session_id": session_id
+                },
+                "session_id": session_id,
+                "timestamp": time.time()
+            }))
+            return data
 
-        # Clean and parse JSON
-        ai_response = ai_result['response']
-        cleaned = re.sub(r'[^\x20-\x7E\n\r\t]+', '', ai_response)
-        clean_str = cleaned.replace("```json", "").replace("```", "").strip()
+    await websocket.send(json.dumps({
+        "type": "API RESPONSE",
+        "message": ai_result,
+        "session_id": session_id,
+        "timestamp": time.time()
+    }))
 
-        # Try to repair JSON
-        try:
-            repaired_json = repair_json(clean_str)
-            data = json.loads(repaired_json)
-        except json.JSONDecodeError:
-            # Fallback: extract JSON using regex
-            json_match = re.search(r'\{.*\}', clean_str, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-            else:
-                raise ValueError("Could not parse JSON from AI response")
+    if not ai_result['success']:
+        raise ValueError(ai_result.get('error', 'AI query failed'))
+
+    # Parse JSON, falling back to json_repair only when strict parsing fails
+    try:
+        return parse_ai_json(ai_result['response'])
+    except ValueError:
+        # Don't serve an unparseable reply again for the same command
+        await LLM_CLIENT.forget(prompt)
+        raise
+
+# === Speculative Classification ===
+# With SPECULATIVE_LLM the transcript is sent to the LLM as soon as an
+# utterance ends. If the confirm phrase then arrives with no new content the
+# command reuses that call; any new content cancels it and starts another.
+
+def start_speculation(session: SessionData):
+    """Classify the transcript so far in the background, replacing a stale speculative call"""
+    text = " ".join(session.transcriptions)
+    key = normalize_prompt(text)
+    if session.speculation is not None:
+        if session.speculation[0] == key:
+            return
+        cancel_speculation(session)
+    if not key:
+        return
+    if RULE_CLASSIFIER and INTENT_RULES.classify(text)["confidence"] >= RULE_CONFIDENCE_THRESHOLD:
+        return  # the rules will answer instantly on confirm
+    prompt = PROMPT_TEMPLATE.format(text=text)
+    session.speculation = (key, asyncio.create_task(query_ai_async(prompt, session.session_id)))
+    SPECULATION_STATS["started"] += 1
+
+def cancel_speculation(session: SessionData):
+    if session.speculation is not None:
+        task = session.speculation[1]
+        if not task.done():
+            task.cancel()
+            SPECULATION_STATS["cancelled"] += 1
+        session.speculation = None
+
+def take_speculation(session: SessionData, text: str) -> Optional[asyncio.Task]:
+    """Hand over the speculative call if it was made for the same content as text"""
+    speculation, session.speculation = session.speculation, None
+    if speculation is None:
+        return None
+    key, task = speculation
+    if key == normalize_prompt(text):
+        # Counted as reused or discarded once the caller knows whether it used the result
+        return task
+    discard_speculation(task)
+    return None
+
+def discard_speculation(task: asyncio.Task):
+    """Drop a speculative call whose result won't be used"""
+    if not task.done():
+        task.cancel()
+    SPECULATION_STATS["discarded"] += 1
+
+async def process_transcription(text: str, session_id: str, websocket,
+                                speculative: Optional[asyncio.Task] = None) -> Dict[str, Any]:
+    """Process transcription through AI and notes manager"""
+    try:
+        # Send immediate acknowledgment
+        await websocket.send(json.dumps({
+            "type": "PROCESSING",
+            "message": "Processing your request...",
+            "session_id": session_id,
+            "timestamp": time.time()
+        }))
+
+        # Formulaic commands are classified locally, skipping the LLM round trip
+        data = INTENT_RULES.try_classify(text) if RULE_CLASSIFIER else None
+        if data is not None:
+            if speculative is not None:
+                discard_speculation(speculative)
+            await websocket.send(json.dumps({
+                "type": "API RESPONSE",
+                "message": {
+                    "success": True,
+                    "source": "rules",
+                    "response": data,
+                    "session_id": session_id
+                },
+                "session_id": session_id,
+                "timestamp": time.time()
+            }))
+        else:
+            data = await classify_with_llm(text, session_id, websocket, speculative)
 
         # Validate required fields
         required_fields = ['intent', 'context', 'action', 'text']
@@ -327,6 +638,20 @@ async def process_transcription(text: str, session_id: str, websocket) -> Dict[s
             "session_id": session_id,
             "timestamp": time.time()
             }))
+
+        elif data["intent"] == "search_notes":
+            query = " ".join(data["text"]) if isinstance(data["text"], list) else str(data["text"]).strip()
+            # "general" is the classifier's default, not a scope the user asked for
+            scope = data["context"] if data["context"] not in ("", "general") else None
+            result = await asyncio.to_thread(notes_manager.search_notes, query, scope)
+            data["results"] = result["results"]
+
+            await websocket.send(json.dumps({
+            "type": "SEARCH RESULTS",
+            "message": result,
+            "session_id": session_id,
+            "timestamp": time.time()
+            }))
         return data
 
     except Exception as e:
@@ -359,6 +684,14 @@ async def generate_feedback(processed_data: Dict[str, Any], session_id: str) ->
 
     default_feedback = "✅ Action completed successfully."
 
+    if intent == "search_notes" and "results" in processed_data:
+        results = processed_data["results"]
+        if not results:
+            return f"🔍 No notes found for '{processed_data.get('text', '')}'."
+        top = results[0]
+        where = f"'{top['context']}'" + (f" ({top['date']})" if top["date"] else "")
+        return f"🔍 Found {len(results)} matching notes. Best match in {where}: {top['snippet']}"
+
     feedback = feedback_templates.get(intent, default_feedback).format(
         context=context,
         action=action
@@ -386,9 +719,96 @@ def cleanup_session(session_id: str):
         session = sessions[session_id]
         if session.processing_task and not session.processing_task.done():
             session.processing_task.cancel()
+        if session.partial_task and not session.partial_task.done():
+            session.partial_task.cancel()
+        cancel_speculation(session)
+        if VAD_SCHEDULER is not None:
+            VAD_SCHEDULER.release(session_id)
         del sessions[session_id]
         logger.info(f"Cleaned up session: {session_id}")
 
+async def end_utterance(session: SessionData, websocket):
+    """Utterance over (pause or length cap): transcribe it, look for commands, reset the buffer"""
+    session.is_speaking = False
+
+    if session.speech_frame_count >= MIN_SPEECH_FRAMES:
+        await websocket.send(json.dumps({
+            "type": "TRANSCRIPTION_STARTED",
+            "session_id": session.session_id,
+            "message": "Transcription started"
+        }))
+
+        if ARCHIVE_AUDIO:
+            # Copy: the session's buffer is reused for the next utterance
+            spawn_background(save_audio_segment(
+                bytes(session.audio_buffer.bytes_view()), SAMPLE_RATE, session.session_id
+            ))
+
+        transcription = await transcribe_utterance(session)
+
+        if transcription:
+            # Store transcription
+            session.transcriptions.append(transcription)
+
+            await websocket.send(json.dumps({
+            "type": "TRANSCRIPTION_COMPLETED",
+            "session_id": session.session_id,
+            "message": "Transcription started"
+            }))
+            # Send transcription to client
+            await websocket.send(json.dumps({
+                "type": "TRANSCRIPTION",
+                "text": transcription,
+                "session_id": session.session_id,
+                "timestamp": time.time()
+            }))
+
+            # Check only the new text for command phrases; the
+            # matcher carries state across utterances
+            matches = session.command_matcher.feed(transcription)
+
+            if matches:
+                # Combine recent transcriptions, minus trigger-only phrases
+                full_text = " ".join(session.transcriptions)
+                recent_text = strip_spans(
+                    full_text,
+                    [(m.start, m.end) for m in matches
+                     if m.phrase in STRIP_COMMAND_PHRASES]
+                ) or full_text
+
+                await websocket.send(json.dumps({
+                    "type": "PROCESSING_STARTED",
+                    "session_id": session.session_id,
+                    "message": "Prcessing started"
+                }))
+                # Start async processing
+                speculative = take_speculation(session, recent_text)
+                session.processing_task = asyncio.create_task(
+                    process_and_feedback(recent_text, session.session_id,
+                                         websocket, speculative)
+                )
+
+                session.transcriptions.clear()
+                session.command_matcher.reset()
+
+            elif SPECULATIVE_LLM:
+                # Get the LLM going before the confirm phrase arrives
+                start_speculation(session)
+
+    elif session.committed_text or session.partial_task:
+        # Too short to keep; clear any partial text already shown
+        if session.partial_task and not session.partial_task.done():
+            session.partial_task.cancel()
+        await websocket.send(json.dumps({
+            "type": "PARTIAL_TRANSCRIPTION",
+            "text": "",
+            "session_id": session.session_id,
+            "timestamp": time.time()
+        }))
+
+    # Reset buffer
+    reset_utterance(session)
+
 # === Main Audio Handler ===
 async def audio_handler_silerovad(websocket):
     """Handle WebSocket audio stream with VAD"""
@@ -414,103 +834,54 @@ async def audio_handler_silerovad(websocket):
                 logger.warning(f"Invalid chunk size: {len(message)}")
                 continue
 
-            for i in range(0, len(message), CHUNK_SIZE):
-                frame_bytes = message[i:i + CHUNK_SIZE]
-
-                # Convert to tensor for VAD
-                audio_np = np.frombuffer(frame_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-                audio_tensor = torch.from_numpy(audio_np)
-
-                # VAD inference
-                with torch.no_grad():
-                    speech_prob = VAD_MODEL(audio_tensor, SAMPLE_RATE).item()
+            # Convert the whole message at once and score its frames in one
+            # request, batched with other sessions' frames
+            speech_probs = await VAD_SCHEDULER.infer_many(
+                session.session_id, message_frames(session, message)
+            )
+            message_view = memoryview(message)
 
-                is_speech = speech_prob > VAD_THRESHOLD
+            for i, is_speech in enumerate(speech_probs > VAD_THRESHOLD):
+                frame_bytes = message_view[i * CHUNK_SIZE:(i + 1) * CHUNK_SIZE]
 
                 # VAD state machine
                 if is_speech:
                     if not session.is_speaking:
                         logger.info(f"Speech started in session {session.session_id}")
+                        # The utterance starts with the pre-roll, so the onset isn't clipped
+                        session.audio_buffer.begin()
                     session.is_speaking = True
                     session.silent_frame_count = 0
                     session.speech_frame_count += 1
-                    session.audio_buffer.extend(frame_bytes)
+                    session.audio_buffer.push(frame_bytes)
+                    session.frames_since_partial += 1
                 else:
                     if session.is_speaking:
                         session.silent_frame_count += 1
-                        session.audio_buffer.extend(frame_bytes)
+                        session.audio_buffer.push(frame_bytes)
+                        session.last_pause_offset = len(session.audio_buffer)
+                        session.frames_since_partial += 1
 
                         if session.silent_frame_count >= PAUSE_THRESHOLD_FRAMES:
                             logger.info(f"Pause detected in session {session.session_id}")
-                            session.is_speaking = False
-
-                            if session.speech_frame_count >= MIN_SPEECH_FRAMES:
-                                await websocket.send(json.dumps({
-                                    "type": "TRANSCRIPTION_STARTED",
-                                    "session_id": session.session_id,
-                                    "message": "Transcription started"
-                                }))
-                                # Process the audio segment
-                                audio_bytes = bytes(session.audio_buffer)
-
-                                # Save and transcribe
-                                filepath = await save_audio_segment(
-                                    audio_bytes, SAMPLE_RATE, session.session_id
-                                )
-                                transcription = await transcribe_audio(
-                                    filepath, session.session_id
-                                )
-
-                                if transcription:
-                                    # Store transcription
-                                    session.transcriptions.append(transcription)
-
-                                    await websocket.send(json.dumps({
-                                    "type": "TRANSCRIPTION_COMPLETED",
-                                    "session_id": session.session_id,
-                                    "message": "Transcription started"
-                                    }))
-                                    # Send transcription to client
-                                    await websocket.send(json.dumps({
-                                        "type": "TRANSCRIPTION",
-                                        "text": transcription,
-                                        "session_id": session.session_id,
-                                        "timestamp": time.time()
-                                    }))
-
-                                    # Check for command phrases
-                                    command_phrases = [
-                                        "confirm and submit",
-                                        "process notes",
-                                        "save that",
-                                        "add to notes"
-                                    ]
-
-                                    #if any(phrase in transcription.lower() for phrase in command_phrases):
-                                    if any(
-                                        phrase in t.lower()
-                                        for t in session.transcriptions
-                                        for phrase in command_phrases
-                                    ):
-                                        # Combine recent transcriptions
-                                        recent_text = " ".join(session.transcriptions)
-
-                                        await websocket.send(json.dumps({
-                                            "type": "PROCESSING_STARTED",
-                                            "session_id": session.session_id,
-                                            "message": "Prcessing started"
-                                        }))
-                                        # Start async processing
-                                        session.processing_task = asyncio.create_task(
-                                            process_and_feedback(recent_text, session.session_id, websocket)
-                                        )
-
-                                        session.transcriptions.clear()
-
-                            # Reset buffer
-                            session.audio_buffer = bytearray()
-                            session.silent_frame_count = 0
-                            session.speech_frame_count = 0
+                            await end_utterance(session, websocket)
+                    else:
+                        # Pre-roll for the next utterance
+                        session.audio_buffer.push(frame_bytes)
+
+                if session.audio_buffer.full:
+                    logger.warning(f"Utterance in session {session.session_id} reached "
+                                   f"{MAX_UTTERANCE_SECONDS:.0f}s without a pause, cutting it")
+                    await end_utterance(session, websocket)
+
+                # Start a partial decode if it's time and none is in flight
+                if (STREAMING_PARTIALS and session.is_speaking
+                        and session.frames_since_partial >= PARTIAL_INTERVAL_FRAMES
+                        and (session.partial_task is None or session.partial_task.done())):
+                    session.frames_since_partial = 0
+                    session.partial_task = asyncio.create_task(
+                        send_partial_transcription(session, websocket)
+                    )
 
     except websockets.exceptions.ConnectionClosedOK:
         logger.info(f"Client disconnected normally. Session: {session.session_id}")
@@ -521,11 +892,12 @@ async def audio_handler_silerovad(websocket):
         logger.info(f"Handler finished for session: {session.session_id}")
 
 # === Async Processing Pipeline ===
-async def process_and_feedback(text: str, session_id: str, websocket):
+async def process_and_feedback(text: str, session_id: str, websocket,
+                               speculative: Optional[asyncio.Task] = None):
     """Complete async processing pipeline"""
     try:
         # Process transcription
-        processed_data = await process_transcription(text, session_id, websocket)
+        processed_data = await process_transcription(text, session_id, websocket, speculative)
 
         # Generate feedback
         feedback = await generate_feedback(processed_data, session_id)
@@ -581,8 +953,90 @@ async def session_cleanup_task():
 # === Main Server ===
 async def main():
     """Main server function"""
+    global VAD_SCHEDULER, INFERENCE, ASR_BATCHER, LLM_CLIENT, LLM_RESPONSE_CACHE, LLM_DISPATCHER, LLM_POOL
+
+    # Finish any notes rewrite a crash interrupted
+    recovered = await asyncio.to_thread(notes_manager.recover_journals)
+    for filepath, count in recovered.items():
+        logger.warning(f"Replayed {count} journaled write(s) into {filepath}")
+
     # Load models
     await load_models()
+
+    # Load the LLM response cache
+    if LLM_CACHE:
+        LLM_RESPONSE_CACHE = ResponseCache(
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_s=LLM_CACHE_TTL_S,
+            persist_path=os.path.join(CACHE_DIR, "llm_responses.jsonl") if LLM_CACHE_PERSIST else None
+        )
+        await asyncio.to_thread(LLM_RESPONSE_CACHE.load)
+
+    # Open the pooled Ollama client behind the bounded request queue
+    LLM_DISPATCHER = LlmDispatcher(max_in_flight=LLM_MAX_IN_FLIGHT * len(API_URLS))
+    LLM_POOL = EndpointPool(
+        API_URLS,
+        max_failures=LLM_MAX_FAILURES,
+        ejection_s=LLM_EJECTION_S,
+        max_ejection_s=LLM_MAX_EJECTION_S,
+        slow_factor=LLM_SLOW_FACTOR,
+        health_interval_s=LLM_HEALTH_INTERVAL_S
+    )
+    LLM_CLIENT = OllamaClient(
+        API_URLS,
+        model=OLLAMA_MODEL,
+        options=OLLAMA_OPTIONS,
+        timeout_s=LLM_TIMEOUT_S,
+        connect_timeout_s=LLM_CONNECT_TIMEOUT_S,
+        max_connections_per_host=LLM_MAX_CONNECTIONS_PER_HOST,
+        keepalive_s=LLM_KEEPALIVE_S,
+        stream=LLM_STREAMING,
+        cache=LLM_RESPONSE_CACHE,
+        dispatcher=LLM_DISPATCHER,
+        pool=LLM_POOL,
+        retries=LLM_RETRIES,
+        retry_base_s=LLM_RETRY_BASE_S,
+        retry_cap_s=LLM_RETRY_CAP_S,
+        stall_timeout_s=LLM_STALL_TIMEOUT_S,
+        hedge=LLM_HEDGE,
+        hedge_percentile=LLM_HEDGE_PERCENTILE,
+        breaker=CircuitBreaker(failure_threshold=LLM_BREAKER_FAILURES, reset_s=LLM_BREAKER_RESET_S),
+        system=SYSTEM_PROMPT,
+        chat=LLM_CHAT_API,
+        keep_alive=LLM_KEEP_ALIVE
+    )
+    await LLM_CLIENT.start()
+    if LLM_WARMUP:
+        spawn_background(LLM_CLIENT.warm_up())
+
+    # Start inference pools so the event loop only does I/O
+    INFERENCE = InferenceExecutor(
+        asr_model=MODEL,
+        asr_model_name=ASR_MODEL_NAME,
+        asr_mode=ASR_EXECUTOR,
+        asr_workers=ASR_WORKERS,
+        max_asr_pending=ASR_MAX_PENDING,
+        vad_threads=VAD_EXECUTOR_THREADS
+    )
+    INFERENCE.start()
+
+    # Start the cross-session ASR batcher
+    ASR_BATCHER = AsrBatcher(
+        INFERENCE, SAMPLE_RATE,
+        max_batch_size=ASR_MAX_BATCH_SIZE,
+        max_wait_ms=ASR_MAX_WAIT_MS,
+        bucket_ratio=ASR_BUCKET_RATIO
+    )
+    ASR_BATCHER.start()
+
+    # Start the cross-session VAD batcher
+    VAD_SCHEDULER = VadScheduler(
+        VAD_MODEL, SAMPLE_RATE,
+        max_batch_size=VAD_MAX_BATCH_SIZE,
+        max_wait_ms=VAD_MAX_WAIT_MS,
+        executor=INFERENCE
+    )
+    VAD_SCHEDULER.start()
     
     # Start Flask in background
     flask_thread = Thread(target=run_flask, daemon=True)
@@ -608,6 +1062,10 @@ async def main():
             # Clean up all sessions
             for session_id in list(sessions.keys()):
                 cleanup_session(session_id)
+            await VAD_SCHEDULER.stop()
+            await ASR_BATCHER.stop()
+            INFERENCE.shutdown()
+            await LLM_CLIENT.close()
 
 if __name__ == "__main__":
     try:
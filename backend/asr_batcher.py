@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsrRequest:
+    """One waveform waiting to be transcribed"""
+    waveform: np.ndarray
+    future: asyncio.Future
+
+
+class AsrBatcher:
+    """
+    Group utterances that become ready at about the same time, across
+    sessions, into one batched recognize() call.
+
+    Requests are collected for up to max_wait_ms (or until max_batch_size),
+    sorted by length and split into buckets whose longest waveform is at most
+    bucket_ratio times the shortest, so short utterances are not padded out
+    to the length of a long one. Each bucket is one executor call.
+
+    At most max_in_flight batches run at once (one per ASR worker by
+    default). While every worker is busy, new utterances pile up in the
+    queue and are picked up together as the next batch.
+    """
+
+    def __init__(self, executor, sample_rate: int = 16000,
+                 max_batch_size: int = 8, max_wait_ms: float = 50.0,
+                 bucket_ratio: float = 1.5, max_in_flight: Optional[int] = None):
+        self.executor = executor
+        self.sample_rate = sample_rate
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.bucket_ratio = bucket_ratio
+        self.max_in_flight = max_in_flight or executor.asr_workers
+
+        self.queue: asyncio.Queue = None
+        self.slots: asyncio.Semaphore = None
+        self.task: asyncio.Task = None
+        self.batch_tasks: set = set()
+
+        # Metrics
+        self.utterances = 0
+        self.batches = 0
+        self.samples = 0
+        self.padded_samples = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.task = asyncio.create_task(self._run())
+        logger.info(
+            f"ASR batcher started (max_batch={self.max_batch_size}, "
+            f"max_wait={self.max_wait * 1000:.0f}ms, bucket_ratio={self.bucket_ratio})"
+        )
+
+    async def stop(self):
+        """Stop batching and fail anything not yet transcribed"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        for task in list(self.batch_tasks):
+            task.cancel()
+        if self.batch_tasks:
+            await asyncio.gather(*self.batch_tasks, return_exceptions=True)
+
+        while self.queue and not self.queue.empty():
+            request = self.queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("ASR batcher stopped"))
+
+    # --- Public API ---
+
+    async def transcribe(self, waveform: np.ndarray) -> str:
+        """Queue a float32 waveform and await its transcription"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(AsrRequest(waveform, future))
+        return await future
+
+    @property
+    def average_batch_size(self) -> float:
+        if not self.batches:
+            return 0.0
+        return self.utterances / self.batches
+
+    @property
+    def padding_waste(self) -> float:
+        """Fraction of decoded samples that were padding"""
+        if not self.padded_samples:
+            return 0.0
+        return 1.0 - self.samples / self.padded_samples
+
+    # --- Batching Loop ---
+
+    async def _collect(self) -> List[AsrRequest]:
+        """Wait for one utterance, then up to max_wait for more"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def _bucket(self, batch: List[AsrRequest]) -> List[List[AsrRequest]]:
+        """Split requests into length buckets to limit padding"""
+        buckets: List[List[AsrRequest]] = []
+        for request in sorted(batch, key=lambda r: len(r.waveform)):
+            if buckets:
+                shortest = max(len(buckets[-1][0].waveform), 1)
+                if len(request.waveform) <= shortest * self.bucket_ratio:
+                    buckets[-1].append(request)
+                    continue
+            buckets.append([request])
+        return buckets
+
+    async def _run(self):
+        while True:
+            await self.slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self.slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[AsrRequest]):
+        try:
+            for bucket in self._bucket(batch):
+                await self._run_bucket(bucket)
+        finally:
+            self.slots.release()
+
+    async def _run_bucket(self, bucket: List[AsrRequest]):
+        lengths = [len(r.waveform) for r in bucket]
+        try:
+            if len(bucket) == 1:
+                results = [await self.executor.recognize(
+                    bucket[0].waveform, sample_rate=self.sample_rate
+                )]
+            else:
+                results = await self.executor.recognize(
+                    [r.waveform for r in bucket], sample_rate=self.sample_rate
+                )
+
+            self.utterances += len(bucket)
+            self.batches += 1
+            self.samples += sum(lengths)
+            self.padded_samples += max(lengths) * len(bucket)
+
+            for request, text in zip(bucket, results):
+                if not request.future.done():
+                    request.future.set_result(text)
+        except Exception as e:
+            logger.error(f"Batched ASR failed for {len(bucket)} utterances: {e}")
+            for request in bucket:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            # Cancelled mid-flight (shutdown): don't leave callers waiting forever
+            for request in bucket:
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("ASR batch cancelled"))
@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class UtteranceBuffer:
+    """
+    One session's audio in a single preallocated int16 array.
+
+    While idle, frames go round a small ring that keeps the last
+    pre_roll_samples, so the onset that preceded the first VAD-positive frame
+    isn't lost. begin() moves that pre-roll to the front of the array and the
+    utterance is appended linearly after it, so byte offsets into
+    bytes_view() stay valid until reset(). The array never grows: once fewer
+    than a frame's worth of samples are left, full is set and the caller
+    must cut the utterance.
+    """
+
+    def __init__(self, max_samples: int, pre_roll_samples: int = 0):
+        self.pre_roll_samples = pre_roll_samples
+        self.data = np.zeros(pre_roll_samples + max_samples, dtype=np.int16)
+        self.raw = memoryview(self.data).cast('B')   # byte view, so frames are copied in with a memcpy
+        self.length = 0       # samples held: pre-roll while idle, pre-roll + utterance while active
+        self.head = 0         # next write position in the pre-roll ring
+        self.active = False
+        self.utterance = 0    # bumped by reset(), so readers can tell an utterance has ended
+        self.last_frame = 0   # samples in the last frame pushed, for full
+
+    def __len__(self) -> int:
+        """Bytes of audio held, like the bytearray this replaces"""
+        return self.length * 2
+
+    @property
+    def full(self) -> bool:
+        return self.active and len(self.data) - self.length < self.last_frame
+
+    def push(self, frame_bytes: bytes):
+        """Append a frame to the utterance, or to the pre-roll ring while idle"""
+        n = len(frame_bytes) // 2
+        self.last_frame = n
+        if self.active:
+            if self.length + n > len(self.data):
+                raise OverflowError("Utterance buffer is full; cut the utterance first")
+            self.raw[self.length * 2:(self.length + n) * 2] = frame_bytes
+            self.length += n
+            return
+
+        if self.pre_roll_samples == 0:
+            return
+        if n >= self.pre_roll_samples:
+            self.raw[:self.pre_roll_samples * 2] = frame_bytes[-self.pre_roll_samples * 2:]
+            self.head = 0
+            self.length = self.pre_roll_samples
+            return
+        first = min(n, self.pre_roll_samples - self.head)
+        self.raw[self.head * 2:(self.head + first) * 2] = frame_bytes[:first * 2]
+        self.raw[:(n - first) * 2] = frame_bytes[first * 2:]
+        self.head = (self.head + n) % self.pre_roll_samples
+        self.length = min(self.length + n, self.pre_roll_samples)
+
+    def begin(self):
+        """Speech started: put the pre-roll in order at the front of the array"""
+        if self.length == self.pre_roll_samples and self.head:
+            # Ring has wrapped; oldest sample is at head. A one-off copy of at most pre_roll_samples
+            self.data[:self.length] = np.concatenate((self.data[self.head:self.length], self.data[:self.head]))
+        self.head = 0
+        self.active = True
+
+    def bytes_view(self) -> memoryview:
+        """Zero-copy PCM16 bytes of the audio held; only valid until the next reset()"""
+        return self.raw[:self.length * 2]
+
+    def reset(self):
+        """Drop the utterance and start collecting pre-roll again"""
+        self.length = 0
+        self.head = 0
+        self.active = False
+        self.utterance += 1
@@ -0,0 +1,111 @@
+"""
+Benchmark: one recognize() call per utterance vs. the cross-session AsrBatcher.
+
+N concurrent speakers each finish an utterance (2-6 s of audio) at a random
+moment inside a 300 ms window, for several rounds. Reports throughput and
+per-utterance latency for unbatched (max_batch_size=1) and batched runs.
+
+By default the real Parakeet model is loaded through onnx_asr. --simulated
+swaps in a stand-in whose cost is a fixed per-call overhead plus a per-sample
+cost over the padded batch, for checking the scheduling side without the model.
+
+Usage:
+    python benchmarks/bench_asr_batcher.py [--speakers 4 16 64] [--rounds 3] [--simulated]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asr_batcher import AsrBatcher  # noqa: E402
+from inference_executor import InferenceExecutor  # noqa: E402
+
+SAMPLE_RATE = 16000
+ASR_MODEL_NAME = "nemo-parakeet-tdt-0.6b-v3"
+
+
+class SimulatedAsr:
+    """Stand-in model: fixed overhead per call plus cost per padded sample"""
+
+    def __init__(self, call_overhead_s: float = 0.08, seconds_per_audio_second: float = 0.05):
+        self.call_overhead_s = call_overhead_s
+        self.per_sample = seconds_per_audio_second / SAMPLE_RATE
+
+    def recognize(self, waveform, sample_rate=SAMPLE_RATE):
+        batch = waveform if isinstance(waveform, list) else [waveform]
+        padded = max(len(w) for w in batch) * len(batch)
+        time.sleep(self.call_overhead_s + padded * self.per_sample)
+        texts = ["simulated transcript"] * len(batch)
+        return texts if isinstance(waveform, list) else texts[0]
+
+
+def load_model(simulated: bool):
+    if simulated:
+        return SimulatedAsr()
+    import onnx_asr
+    return onnx_asr.load_model(ASR_MODEL_NAME)
+
+
+async def run(model, speakers: int, rounds: int, max_batch_size: int, seed: int = 0):
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+
+    executor = InferenceExecutor(asr_model=model, max_asr_pending=64)
+    executor.start()
+    batcher = AsrBatcher(executor, SAMPLE_RATE, max_batch_size=max_batch_size)
+    batcher.start()
+
+    latencies = []
+
+    async def speaker():
+        for _ in range(rounds):
+            await asyncio.sleep(rng.uniform(0, 0.3))
+            seconds = rng.uniform(2.0, 6.0)
+            waveform = (noise.standard_normal(int(seconds * SAMPLE_RATE)) * 0.05).astype(np.float32)
+            start = time.perf_counter()
+            await batcher.transcribe(waveform)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(speaker() for _ in range(speakers)))
+    elapsed = time.perf_counter() - start
+
+    avg_batch = batcher.average_batch_size
+    await batcher.stop()
+    executor.shutdown()
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "avg_batch": avg_batch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--speakers", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--simulated", action="store_true")
+    args = parser.parse_args()
+
+    model = load_model(args.simulated)
+
+    print(f"{'speakers':>8} | {'mode':>9} | {'utt/s':>7} | {'p50 s':>6} | {'p95 s':>6} | {'avg batch':>9}")
+    print("-" * 62)
+    for n in args.speakers:
+        for label, batch_size in (("unbatched", 1), ("batched", args.max_batch_size)):
+            r = asyncio.run(run(model, n, args.rounds, batch_size))
+            print(f"{n:>8} | {label:>9} | {r['throughput']:>7.2f} | {r['p50']:>6.2f} | "
+                  f"{r['p95']:>6.2f} | {r['avg_batch']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
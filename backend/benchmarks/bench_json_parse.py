@@ -0,0 +1,85 @@
+"""
+Benchmark: always-repair JSON parsing vs. the tiered parse_ai_json.
+
+Replays a corpus of Ollama replies (one {"response": ...} per line) and
+reports the mean parse cost per response for each path, plus which tier
+handled each reply. Append captured "API RESPONSE" payloads to the corpus to
+benchmark against real traffic.
+
+Usage:
+    python benchmarks/bench_json_parse.py [--corpus benchmarks/data/ollama_outputs.jsonl] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from json_repair import repair_json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from response_parser import PARSE_TIER_COUNTS, parse_ai_json  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ollama_outputs.jsonl")
+
+
+def parse_always_repair(ai_response: str):
+    """The previous parsing path in process_transcription"""
+    cleaned = re.sub(r'[^\x20-\x7E\n\r\t]+', '', ai_response)
+    clean_str = cleaned.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(repair_json(clean_str))
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{.*\}', clean_str, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        raise ValueError("Could not parse JSON from AI response")
+
+
+def time_per_response(fn, corpus, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for response in corpus:
+            try:
+                fn(response)
+            except ValueError:
+                pass
+    return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = [json.loads(line)["response"] for line in f if line.strip()]
+
+    # One pass to record which tier each reply needs
+    well_formed = []
+    for response in corpus:
+        before = PARSE_TIER_COUNTS["strict"] + PARSE_TIER_COUNTS["slice"]
+        try:
+            parse_ai_json(response)
+        except ValueError:
+            pass
+        if PARSE_TIER_COUNTS["strict"] + PARSE_TIER_COUNTS["slice"] > before:
+            well_formed.append(response)
+    tiers = dict(PARSE_TIER_COUNTS)
+
+    print(f"corpus: {len(corpus)} responses, {args.repeat} passes")
+    print(f"tiers:  {tiers}")
+    for label, subset in (("all replies", corpus), ("well-formed only", well_formed)):
+        if not subset:
+            continue
+        baseline = time_per_response(parse_always_repair, subset, args.repeat)
+        tiered = time_per_response(parse_ai_json, subset, args.repeat)
+        print(f"{label}:")
+        print(f"  always repair_json: {baseline:8.1f} us/response")
+        print(f"  tiered parse:       {tiered:8.1f} us/response  ({baseline / tiered:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
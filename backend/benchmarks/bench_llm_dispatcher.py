@@ -0,0 +1,135 @@
+"""
+Benchmark: unbounded LLM requests vs. the LlmDispatcher queue.
+
+A burst of confirmed commands hits a simulated Ollama server that runs
+--parallel requests at full speed and time-shares beyond that (every active
+request slows down together). One chatty session sends --chatty requests,
+the others send --per-session each. Every request has the same deadline.
+
+Reports how many requests finished in time, how many timed out after
+using server time, how many the dispatcher dropped early, latency of the
+successful ones, and when the last quiet session was served (fairness).
+
+Times are scaled by --scale so a 30 s deadline runs in a few seconds.
+
+Usage:
+    python benchmarks/bench_llm_dispatcher.py [--sessions 30] [--per-session 2] [--chatty 20]
+                                              [--work 2.0] [--deadline 30] [--max-in-flight 4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_dispatcher import DeadlineExceeded, LlmDispatcher  # noqa: E402
+
+TICK_S = 0.005
+
+
+class SimulatedOllama:
+    """Processor-sharing server: each request gets min(1, parallel / active) of a worker"""
+
+    def __init__(self, parallel: int):
+        self.parallel = parallel
+        self.active = {}   # future -> remaining work (s)
+        self.busy_s = 0.0  # work done, including for requests that later timed out
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        while True:
+            await asyncio.sleep(TICK_S)
+            now = loop.time()
+            if self.active:
+                rate = min(1.0, self.parallel / len(self.active))
+                for future in list(self.active):
+                    if future.done():
+                        del self.active[future]
+                        continue
+                    done = (now - last) * rate
+                    self.active[future] -= done
+                    self.busy_s += done
+                    if self.active[future] <= 0:
+                        del self.active[future]
+                        future.set_result("{}")
+            last = now
+
+    async def generate(self, work: float) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self.active[future] = work
+        return await future
+
+
+async def run(args, bounded: bool):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    server = SimulatedOllama(args.parallel)
+    ticker = asyncio.create_task(server.run())
+    dispatcher = LlmDispatcher(max_in_flight=args.max_in_flight,
+                               initial_service_s=args.work * args.scale)
+    deadline_s = args.deadline * args.scale
+    outcomes = []
+
+    async def command(session_id: str):
+        start = loop.time()
+        deadline = start + deadline_s
+        work = args.work * args.scale * rng.uniform(0.7, 1.3)
+
+        async def call():
+            remaining = deadline - loop.time()
+            return await asyncio.wait_for(server.generate(work), max(remaining, 0.0))
+
+        try:
+            if bounded:
+                await dispatcher.submit(session_id, call, deadline)
+            else:
+                await call()
+            outcomes.append((session_id, "ok", loop.time() - start))
+        except DeadlineExceeded:
+            outcomes.append((session_id, "dropped", loop.time() - start))
+        except asyncio.TimeoutError:
+            outcomes.append((session_id, "timeout", loop.time() - start))
+
+    jobs = [command("chatty") for _ in range(args.chatty)]
+    jobs += [command(f"s{i}") for i in range(args.sessions - 1) for _ in range(args.per_session)]
+    await asyncio.gather(*jobs)
+    ticker.cancel()
+
+    ok = [t / args.scale for _, status, t in outcomes if status == "ok"]
+    quiet_ok = [t / args.scale for s, status, t in outcomes if status == "ok" and s != "chatty"]
+    counts = {status: sum(1 for _, st, _ in outcomes if st == status) for status in ("ok", "timeout", "dropped")}
+    label = f"dispatcher (max_in_flight={args.max_in_flight})" if bounded else "unbounded"
+    print(f"{label}:")
+    print(f"  finished in time   {counts['ok']:4d} / {len(outcomes)}")
+    print(f"  timed out          {counts['timeout']:4d}")
+    print(f"  dropped early      {counts['dropped']:4d}")
+    if ok:
+        print(f"  latency p50/p95    {np.percentile(ok, 50):6.1f} s / {np.percentile(ok, 95):6.1f} s")
+    if quiet_ok:
+        print(f"  quiet sessions     {len(quiet_ok)} served, last at {max(quiet_ok):.1f} s")
+    print(f"  server time used   {server.busy_s / args.scale:6.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--per-session", type=int, default=2)
+    parser.add_argument("--chatty", type=int, default=20)
+    parser.add_argument("--work", type=float, default=2.0, help="seconds per request at full speed")
+    parser.add_argument("--parallel", type=int, default=4, help="requests the server runs at full speed")
+    parser.add_argument("--deadline", type=float, default=30.0)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--scale", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args, bounded=False))
+    asyncio.run(run(args, bounded=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: Ollama endpoint pool against local stub servers.
+
+Starts three stub Ollama servers on localhost: "fast", "slow" (several
+times the fast latency) and "flaky" (answers HTTP 500 during a window in
+the middle of the run, and fails its /api/tags health check meanwhile).
+--clients concurrent callers then send prompts through OllamaClient for
+--seconds, first with ejection disabled (least-outstanding routing only),
+then with passive and active health checks.
+
+Reports requests and errors per endpoint, ejections, overall error rate
+and latency.
+
+Usage:
+    python benchmarks/bench_llm_pool.py [--clients 16] [--seconds 6] [--fast-ms 50] [--slow-ms 400]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_client import OllamaClient  # noqa: E402
+from llm_pool import EndpointPool  # noqa: E402
+
+BASE_PORT = 18430
+
+
+class StubOllama:
+    """/api/generate answering after latency_s; fails with 500 while broken() is true"""
+
+    def __init__(self, name: str, port: int, latency_s: float, broken=lambda: False):
+        self.name = name
+        self.port = port
+        self.latency_s = latency_s
+        self.broken = broken
+        self.runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/generate"
+
+    async def generate(self, request):
+        await request.json()
+        if self.broken():
+            return web.Response(status=500, text="stub failure")
+        await asyncio.sleep(self.latency_s)
+        return web.json_response({"response": json.dumps({"intent": "take_notes"}), "done": True})
+
+    async def tags(self, request):
+        if self.broken():
+            return web.Response(status=500, text="stub failure")
+        return web.json_response({"models": []})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_get("/api/tags", self.tags)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def run(args, health_checks: bool):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    def flaky_window() -> bool:
+        elapsed = loop.time() - started
+        return args.seconds * 0.3 <= elapsed < args.seconds * 0.6
+
+    stubs = [
+        StubOllama("fast", BASE_PORT, args.fast_ms / 1000),
+        StubOllama("slow", BASE_PORT + 1, args.slow_ms / 1000),
+        StubOllama("flaky", BASE_PORT + 2, args.fast_ms / 1000, broken=flaky_window),
+    ]
+    for stub in stubs:
+        await stub.start()
+
+    urls = [stub.url for stub in stubs]
+    if health_checks:
+        pool = EndpointPool(urls, ejection_s=args.seconds * 0.1, health_interval_s=args.seconds * 0.05)
+    else:
+        pool = EndpointPool(urls, max_failures=10 ** 9, slow_factor=float("inf"), health_interval_s=3600)
+    client = OllamaClient(urls, stream=False, pool=pool)
+    await client.start()
+
+    latencies = []
+    errors = 0
+
+    async def caller(i: int):
+        nonlocal errors
+        while loop.time() - started < args.seconds:
+            t0 = time.perf_counter()
+            result = await client.generate(f"command {i}", f"session-{i}")
+            if result["success"]:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(caller(i) for i in range(args.clients)))
+    await client.close()
+    for stub in stubs:
+        await stub.stop()
+
+    total = len(latencies) + errors
+    print("with health checks:" if health_checks else "least-outstanding only:")
+    for stub in stubs:
+        stats = pool.stats()[stub.url]
+        print(f"  {stub.name:<6} requests {stats['requests']:5d}  errors {stats['errors']:4d}  "
+              f"ejections {stats['ejections']}")
+    print(f"  total  {total} requests, {errors} errors ({errors / max(total, 1):.1%}), "
+          f"{total / args.seconds:.0f} req/s")
+    if latencies:
+        print(f"  latency p50/p95  {np.percentile(latencies, 50) * 1000:.0f} / "
+              f"{np.percentile(latencies, 95) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--fast-ms", type=float, default=50.0)
+    parser.add_argument("--slow-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args, health_checks=False))
+    asyncio.run(run(args, health_checks=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark: time-to-first-token with the instructions as a warm system prompt.
+
+A stub Ollama server models where the time goes on a CPU box:
+  - loading the model (--load-s) when it isn't resident; it is unloaded
+    once idle for longer than the last request's keep_alive (Ollama's
+    default is 5 minutes),
+  - prompt evaluation at --prefill-s per token, skipping the longest prefix
+    shared with the previous request (the KV cache, lost on unload),
+  - generation at --decode-s per token.
+Sporadic voice commands (exponential gaps, mean --gap-s) are sent:
+  before  whole instructions + text as the prompt, default keep_alive
+  after   instructions as the /api/chat system message, keep_alive=30m,
+          warm_up() at startup
+and time-to-first-token and total latency are reported in model seconds.
+All times are scaled by --scale so an hour of traffic takes seconds.
+
+Usage:
+    python benchmarks/bench_llm_prefix.py [--requests 30] [--gap-s 240] [--prefix-tokens 300] [--scale 0.001]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_client import OllamaClient  # noqa: E402
+
+PORT = 18470
+DEFAULT_KEEP_ALIVE_S = 300.0
+OUTPUT_TOKENS = 40
+REPLY = json.dumps({"intent": "take_notes", "context": "linux", "action": "insert", "text": ["chmod usage"]})
+
+
+def keep_alive_seconds(value) -> float:
+    if value is None:
+        return DEFAULT_KEEP_ALIVE_S
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    number, unit = re.fullmatch(r"(-?\d+(?:\.\d+)?)([smh]?)", value).groups()
+    seconds = float(number) * {"": 1, "s": 1, "m": 60, "h": 3600}[unit]
+    return float("inf") if seconds < 0 else seconds
+
+
+class PrefixCostStub:
+    """One-slot Ollama stand-in charging for model loads and uncached prompt tokens"""
+
+    def __init__(self, args):
+        self.args = args
+        self.loaded_at_last_use = None   # model time of the last request, None when unloaded
+        self.keep_alive_s = DEFAULT_KEEP_ALIVE_S
+        self.cached_tokens = []
+        self.loads = 0
+        self.prefilled = 0
+        self.runner = None
+
+    def model_time(self) -> float:
+        return time.monotonic() / self.args.scale
+
+    async def handle(self, request):
+        body = await request.json()
+        if "messages" in body:
+            tokens = " ".join(m["content"] for m in body["messages"]).split()
+        else:
+            tokens = (body.get("system", "") + " " + body["prompt"]).split()
+
+        now = self.model_time()
+        cost = 0.0
+        if self.loaded_at_last_use is None or now - self.loaded_at_last_use > self.keep_alive_s:
+            cost += self.args.load_s
+            self.cached_tokens = []
+            self.loads += 1
+        shared = 0
+        for a, b in zip(tokens, self.cached_tokens):
+            if a != b:
+                break
+            shared += 1
+        cost += (len(tokens) - shared) * self.args.prefill_s
+        self.prefilled += len(tokens) - shared
+        self.cached_tokens = tokens
+        self.keep_alive_s = keep_alive_seconds(body.get("keep_alive"))
+
+        output_tokens = body.get("options", {}).get("num_predict") or OUTPUT_TOKENS
+        key = "message" if "messages" in body else "response"
+
+        def chunk(text, done=False):
+            value = {"role": "assistant", "content": text} if key == "message" else text
+            return (json.dumps({key: value, "done": done}) + "\n").encode()
+
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await asyncio.sleep(cost * self.args.scale)   # time to first token
+        await response.write(chunk(REPLY[:1]))
+        await asyncio.sleep((output_tokens - 1) * self.args.decode_s * self.args.scale)
+        await response.write(chunk(REPLY[1:]))
+        await response.write(chunk("", done=True))
+        self.loaded_at_last_use = self.model_time()
+        return response
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/generate", self.handle)
+        app.router.add_post("/api/chat", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", PORT).start()
+
+
+async def run(args, after: bool):
+    stub = PrefixCostStub(args)
+    await stub.start()
+    instructions = " ".join(f"rule{i}" for i in range(args.prefix_tokens))
+    url = f"http://127.0.0.1:{PORT}/api/generate"
+    if after:
+        client = OllamaClient(url, stream=True, system=instructions, chat=True, keep_alive="30m",
+                              timeout_s=600)
+    else:
+        client = OllamaClient(url, stream=True, timeout_s=600)
+    await client.start()
+    if after:
+        await client.warm_up()
+
+    rng = random.Random(args.seed)
+    totals = []
+    for i in range(args.requests):
+        await asyncio.sleep(rng.expovariate(1 / args.gap_s) * args.scale)
+        text = f"add to notes in linux category chmod usage number {i}"
+        prompt = text if after else instructions + "\n" + text
+        t0 = time.monotonic()
+        result = await client.generate(prompt, "bench", on_field=None)
+        assert result["success"], result
+        totals.append((time.monotonic() - t0) / args.scale)
+    await client.close()
+    await stub.runner.cleanup()
+
+    ttft = [t / args.scale for t in client.first_token.samples]
+    label = "after (system prompt, keep_alive=30m, warm-up)" if after else "before (full prompt, default keep_alive)"
+    print(f"{label}:")
+    print(f"  time to first token  p50 {np.percentile(ttft, 50):6.2f} s   p95 {np.percentile(ttft, 95):6.2f} s")
+    print(f"  total                p50 {np.percentile(totals, 50):6.2f} s   p95 {np.percentile(totals, 95):6.2f} s")
+    print(f"  model loads {stub.loads}, prompt tokens evaluated {stub.prefilled}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--gap-s", type=float, default=240.0, help="mean model-seconds between commands")
+    parser.add_argument("--prefix-tokens", type=int, default=300)
+    parser.add_argument("--load-s", type=float, default=4.0)
+    parser.add_argument("--prefill-s", type=float, default=0.02)
+    parser.add_argument("--decode-s", type=float, default=0.06)
+    parser.add_argument("--scale", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args, after=False))
+    asyncio.run(run(args, after=True))
+
+
+if __name__ == "__main__":
+    main()
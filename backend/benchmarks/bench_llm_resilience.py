@@ -0,0 +1,126 @@
+"""
+Benchmark: tail latency with hedged/retried LLM requests and the circuit breaker.
+
+Two stub Ollama servers on localhost answer in about --base-ms, except
+that --stall-rate of requests stall for --stall-ms (a GC pause, a model
+swap, a slow CPU box). Sequential callers measure latency percentiles:
+  plain    one attempt, no hedging
+  hedged   a duplicate goes to the other server past the p95 latency
+Then both servers go down (every request gets HTTP 500) and requests are
+timed with and without the circuit breaker: with it, calls fail
+immediately once it opens, so the caller can fall back at once.
+
+Usage:
+    python benchmarks/bench_llm_resilience.py [--requests 400] [--base-ms 40] [--stall-rate 0.03] [--stall-ms 1500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_client import OllamaClient  # noqa: E402
+from llm_pool import EndpointPool  # noqa: E402
+from llm_resilience import CircuitBreaker  # noqa: E402
+
+BASE_PORT = 18450
+
+
+class StubOllama:
+    def __init__(self, port: int, args, rng: random.Random):
+        self.port = port
+        self.args = args
+        self.rng = rng
+        self.down = False
+        self.runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/generate"
+
+    async def generate(self, request):
+        await request.json()
+        if self.down:
+            await asyncio.sleep(self.args.base_ms / 1000)
+            return web.Response(status=500, text="backend down")
+        delay = self.args.base_ms * self.rng.uniform(0.8, 1.2)
+        if self.rng.random() < self.args.stall_rate:
+            delay = self.args.stall_ms
+        await asyncio.sleep(delay / 1000)
+        return web.json_response({"response": json.dumps({"intent": "take_notes"}), "done": True})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+
+def percentiles(samples):
+    return " / ".join(f"{np.percentile(samples, q) * 1000:6.0f}" for q in (50, 95, 99))
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    stubs = [StubOllama(BASE_PORT + i, args, rng) for i in range(2)]
+    for stub in stubs:
+        await stub.start()
+    urls = [stub.url for stub in stubs]
+
+    def make_client(**kwargs) -> OllamaClient:
+        pool = EndpointPool(urls, slow_factor=float("inf"), health_interval_s=3600)
+        return OllamaClient(urls, stream=False, pool=pool, **kwargs)
+
+    print(f"{'latency (ms)':<14} {'p50':>6} / {'p95':>6} / {'p99':>6}   duplicates")
+    for label, kwargs in (("plain", {}), ("hedged", {"hedge": True})):
+        client = make_client(**kwargs)
+        await client.start()
+        latencies = []
+        for i in range(args.requests):
+            t0 = time.perf_counter()
+            result = await client.generate(f"command {i}", "bench")
+            assert result["success"], result
+            latencies.append(time.perf_counter() - t0)
+        print(f"{label:<14} {percentiles(latencies)}   {client.hedged}")
+        await client.close()
+
+    for stub in stubs:
+        stub.down = True
+    print("\nbackend down, 20 requests (retries=2):")
+    for label, breaker in (("no breaker", None), ("breaker", CircuitBreaker(failure_threshold=3, reset_s=60))):
+        client = make_client(retries=2, retry_base_s=0.1, breaker=breaker)
+        await client.start()
+        latencies = []
+        for i in range(20):
+            t0 = time.perf_counter()
+            result = await client.generate(f"command {i}", "bench")
+            assert result.get("unavailable"), result
+            latencies.append(time.perf_counter() - t0)
+        print(f"  {label:<12} total {sum(latencies):5.2f} s, median time to fail "
+              f"{np.median(latencies) * 1000:6.1f} ms")
+        await client.close()
+
+    for stub in stubs:
+        await stub.runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--base-ms", type=float, default=40.0)
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall-ms", type=float, default=1500.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
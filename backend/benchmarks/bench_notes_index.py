@@ -0,0 +1,122 @@
+"""
+Benchmark: whole-file regex rewrites vs. the indexed date-block store.
+
+Builds a context file with --entries dated blocks (~100 bytes each, ~10 MB
+by default) and times insert of a new date, update of the last and of a
+middle block, and delete of the last block through both the previous
+notes_manager implementation and the current one.
+
+Usage:
+    python benchmarks/bench_notes_index.py [--entries 100000] [--repeat 20]
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import notes_manager  # noqa: E402
+from notes_index import drop_index  # noqa: E402
+
+
+# --- Previous implementation (full read + regex + full rewrite) ---
+
+def old_insert_or_update(filepath: str, date: str, text: str):
+    content = notes_manager.read_file(filepath)
+    pattern = rf"(##\s*{re.escape(date)}\s*\n)(.*?)(?=\n##\s*\d{{4}}-\d{{2}}-\d{{2}}|\Z)"
+    new_entry_content = f"## {date}\n{text.strip()}\n"
+    if re.search(pattern, content, flags=re.DOTALL):
+        notes_manager.write_file(filepath, re.sub(pattern, new_entry_content, content, flags=re.DOTALL))
+    else:
+        notes_manager.write_file(filepath, content.strip() + "\n" + new_entry_content)
+
+
+def old_delete(filepath: str, date: str):
+    content = notes_manager.read_file(filepath)
+    pattern = rf"\n?(##\s*{re.escape(date)}\s*\n.*?)(?=\n##\s*\d{{4}}-\d{{2}}-\d{{2}}|\Z)"
+    new_content = re.sub(pattern, "", content, flags=re.DOTALL).strip()
+    if len(new_content) < len(content):
+        notes_manager.write_file(filepath, new_content + "\n")
+
+
+def new_insert_or_update(filepath: str, date: str, text: str):
+    notes_manager.insert_or_update_date_entry(filepath, date, text, "bench")
+
+
+def new_delete(filepath: str, date: str):
+    notes_manager.delete_date_entry(filepath, date, "bench")
+
+
+# --- Harness ---
+
+def build_file(filepath: str, dates):
+    with open(filepath, "w", encoding="utf-8") as f:
+        for i, date in enumerate(dates):
+            f.write(f"## {date}\n- entry {i}: check relay wiring and log the scope capture\n\n")
+
+
+def time_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(label, upsert, delete, template: str, dates, repeat: int):
+    workdir = tempfile.mkdtemp()
+    filepath = os.path.join(workdir, "bench.txt")
+    shutil.copyfile(template, filepath)
+    drop_index(filepath)
+    try:
+        # First call pays for building the index; report it separately
+        start = time.perf_counter()
+        upsert(filepath, dates[-1], "warm up")
+        warm = (time.perf_counter() - start) * 1000
+
+        base = datetime.strptime(dates[-1], notes_manager.DATE_FORMAT)
+        new_dates = [(base + timedelta(minutes=i + 1)).strftime(notes_manager.DATE_FORMAT) for i in range(repeat)]
+        middle = dates[len(dates) // 2]
+
+        results = {
+            "first call": warm,
+            "insert new date": time_ms(lambda i: upsert(filepath, new_dates[i], f"- new {i}"), repeat),
+            "update last": time_ms(lambda i: upsert(filepath, new_dates[-1], f"- edit {i}"), repeat),
+            "update middle": time_ms(lambda i: upsert(filepath, middle, f"- edit {i}"), repeat),
+            "delete last": time_ms(lambda i: delete(filepath, new_dates[-1 - i]), repeat),
+        }
+        print(f"{label}:")
+        for name, ms in results.items():
+            print(f"  {name:<16} {ms:9.2f} ms")
+        with open(filepath, "rb") as f:
+            return f.read()
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    base = datetime(2020, 1, 1)
+    dates = [(base + timedelta(hours=i)).strftime(notes_manager.DATE_FORMAT) for i in range(args.entries)]
+
+    workdir = tempfile.mkdtemp()
+    template = os.path.join(workdir, "template.txt")
+    try:
+        build_file(template, dates)
+        print(f"file: {args.entries} entries, {os.path.getsize(template) / 1e6:.1f} MB, {args.repeat} ops each")
+        old = run("regex rewrite", old_insert_or_update, old_delete, template, dates, args.repeat)
+        new = run("indexed store", new_insert_or_update, new_delete, template, dates, args.repeat)
+        print(f"outputs identical: {old == new}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: per-session utterance audio in a bytearray vs a preallocated ring.
+
+Replays the VAD state machine's buffer traffic for a stuck-open microphone
+(every frame is speech for --seconds) and for a normal utterance whose first
+--onset-frames frames score below the VAD threshold (a soft onset):
+  bytearray   what app.py did: extend() on each speech frame, nothing before
+  ring        audio_ring.UtteranceBuffer with pre-roll and a length cap
+
+Reports time per frame, peak memory held by the buffer (tracemalloc), how
+many cuts the length cap forced, and how much of the soft onset survives.
+
+Usage:
+    python benchmarks/bench_utterance_buffer.py [--seconds 600] [--max-utterance-s 30] [--pre-roll-frames 10]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_ring import UtteranceBuffer  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME_SIZE_SAMPLES = 512
+
+
+def frames(n: int, rng: np.random.Generator):
+    pool = [rng.integers(-3000, 3000, FRAME_SIZE_SAMPLES, dtype=np.int16).tobytes() for _ in range(64)]
+    for i in range(n):
+        yield pool[i % len(pool)]
+
+
+def stuck_mic_bytearray(frame_list, args) -> int:
+    buffer = bytearray()
+    for frame in frame_list:
+        buffer.extend(frame)
+    return 0
+
+
+def stuck_mic_ring(frame_list, args) -> int:
+    buffer = UtteranceBuffer(args.max_samples, args.pre_roll_frames * FRAME_SIZE_SAMPLES)
+    cuts = 0
+    for frame in frame_list:
+        if not buffer.active:
+            buffer.begin()
+        buffer.push(frame)
+        if buffer.full:
+            cuts += 1
+            buffer.reset()
+    return cuts
+
+
+def measure(run, frame_list, args):
+    """Time per frame (untraced pass), then peak memory allocated by the run (traced pass)"""
+    t0 = time.perf_counter()
+    cuts = run(frame_list, args)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    run(frame_list, args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed / len(frame_list), peak, cuts
+
+
+def onset_kept(args, rng) -> int:
+    """Samples of a soft onset (below the VAD threshold) that reach the ASR with the ring"""
+    buffer = UtteranceBuffer(args.max_samples, args.pre_roll_frames * FRAME_SIZE_SAMPLES)
+    for frame in frames(30, rng):           # silence before the utterance
+        buffer.push(frame)
+    onset = [np.full(FRAME_SIZE_SAMPLES, 1, dtype=np.int16).tobytes()] * args.onset_frames
+    for frame in onset:
+        buffer.push(frame)
+    buffer.begin()
+    pcm = np.frombuffer(buffer.bytes_view(), dtype=np.int16)
+    return int(np.count_nonzero(pcm == 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=600.0, help="length of the stuck-open mic")
+    parser.add_argument("--max-utterance-s", type=float, default=30.0)
+    parser.add_argument("--pre-roll-frames", type=int, default=10)
+    parser.add_argument("--onset-frames", type=int, default=6)
+    args = parser.parse_args()
+    args.max_samples = int(args.max_utterance_s * SAMPLE_RATE) // FRAME_SIZE_SAMPLES * FRAME_SIZE_SAMPLES
+
+    n = int(args.seconds * SAMPLE_RATE / FRAME_SIZE_SAMPLES)
+    print(f"stuck-open mic, {args.seconds:.0f}s ({n} frames):")
+    frame_list = list(frames(n, np.random.default_rng(0)))
+    for label, run in (("bytearray", stuck_mic_bytearray), ("ring", stuck_mic_ring)):
+        per_frame, peak, cuts = measure(run, frame_list, args)
+        print(f"  {label:<10} {per_frame * 1e6:6.2f} us/frame   peak {peak / 1e6:7.2f} MB   "
+              f"forced cuts {cuts}")
+
+    onset = args.onset_frames * FRAME_SIZE_SAMPLES
+    kept = onset_kept(args, np.random.default_rng(1))
+    print(f"\nsoft onset of {args.onset_frames} frames ({onset} samples) before the first VAD-positive frame:")
+    print("  bytearray  kept 0 samples")
+    print(f"  ring       kept {kept} samples")
+
+
+if __name__ == "__main__":
+    main()
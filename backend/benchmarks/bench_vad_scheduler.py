@@ -0,0 +1,120 @@
+"""
+Benchmark: per-frame Silero VAD calls vs. the cross-session VadScheduler.
+
+Simulates N sessions each streaming FRAMES_PER_SESSION frames and reports
+frames/sec per core (torch is pinned to one thread). The per-message column
+sends --message-frames frames per request with infer_many(), converting
+each PCM16 message in one operation the way the WebSocket handler does.
+
+Usage:
+    python benchmarks/bench_vad_scheduler.py [--sessions 1 10 100] [--frames 200] [--message-frames 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vad_scheduler import VadScheduler  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME_SIZE_SAMPLES = 512
+
+
+def load_vad():
+    # Same JIT model app.py pulls through torch.hub, from the pip package
+    from silero_vad import load_silero_vad
+    model = load_silero_vad()
+    model.eval()
+    return model
+
+
+def make_frames(n_sessions: int, n_frames: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal((n_sessions, n_frames, FRAME_SIZE_SAMPLES)) * 0.1).astype(np.float32)
+
+
+async def run_baseline(model, frames: np.ndarray) -> float:
+    """One model call per frame per session, interleaved like the old handler"""
+    n_sessions, n_frames, _ = frames.shape
+
+    async def session(idx):
+        for f in range(n_frames):
+            with torch.no_grad():
+                model(torch.from_numpy(frames[idx, f]), SAMPLE_RATE).item()
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(n_sessions)))
+    return n_sessions * n_frames / (time.perf_counter() - start)
+
+
+async def run_scheduler(model, frames: np.ndarray, max_wait_ms: float) -> tuple:
+    n_sessions, n_frames, _ = frames.shape
+    scheduler = VadScheduler(model, SAMPLE_RATE, max_wait_ms=max_wait_ms)
+    scheduler.start()
+
+    async def session(idx):
+        sid = f"s{idx}"
+        for f in range(n_frames):
+            await scheduler.infer(sid, frames[idx, f])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(n_sessions)))
+    elapsed = time.perf_counter() - start
+    await scheduler.stop()
+    return n_sessions * n_frames / elapsed, scheduler.average_batch_size
+
+
+async def run_messages(model, frames: np.ndarray, max_wait_ms: float, message_frames: int) -> float:
+    n_sessions, n_frames, _ = frames.shape
+    pcm = (frames * 32768).astype(np.int16)
+    scheduler = VadScheduler(model, SAMPLE_RATE, max_wait_ms=max_wait_ms)
+    scheduler.start()
+
+    async def session(idx):
+        sid = f"s{idx}"
+        buffer = np.empty((message_frames, FRAME_SIZE_SAMPLES), dtype=np.float32)
+        for f in range(0, n_frames, message_frames):
+            message = pcm[idx, f:f + message_frames].tobytes()
+            batch = buffer[:len(message) // (FRAME_SIZE_SAMPLES * 2)]
+            np.multiply(np.frombuffer(message, dtype=np.int16), 1.0 / 32768.0,
+                        out=batch.reshape(-1), dtype=np.float32)
+            await scheduler.infer_many(sid, batch)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(n_sessions)))
+    elapsed = time.perf_counter() - start
+    await scheduler.stop()
+    return n_sessions * n_frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--message-frames", type=int, default=8)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    model = load_vad()
+
+    print(f"{'sessions':>8} | {'baseline f/s/core':>17} | {'batched f/s/core':>16} | {'avg batch':>9} | "
+          f"{'speedup':>7} | {'per-message f/s/core':>20} | {'speedup':>7}")
+    print("-" * 103)
+    for n in args.sessions:
+        frames = make_frames(n, args.frames)
+        baseline = asyncio.run(run_baseline(model, frames))
+        batched, avg_batch = asyncio.run(run_scheduler(model, frames, args.max_wait_ms))
+        per_message = asyncio.run(run_messages(model, frames, args.max_wait_ms, args.message_frames))
+        print(f"{n:>8} | {baseline:>17.0f} | {batched:>16.0f} | {avg_batch:>9.1f} | {batched / baseline:>6.1f}x | "
+              f"{per_message:>20.0f} | {per_message / baseline:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
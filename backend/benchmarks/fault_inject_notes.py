@@ -0,0 +1,230 @@
+"""
+Fault injection for the notes write path: crash at every I/O step, recover,
+and check the context file is either the old or the new version.
+
+For each scenario the write is first run to completion to count its I/O
+steps (write/truncate/fsync/rename on the notes files). It is then re-run in
+a child process once per step, and the child hard-exits at that step; a
+crashing write first writes a random prefix of its data (torn write). The
+parent runs notes_manager.recover_journals() like app.py does at startup
+and checks:
+  - the file equals the state before or after the operation (a pure append
+    may also leave a prefix of the appended bytes),
+  - the block index agrees with a fresh scan, and a follow-up update works.
+
+Usage:
+    python benchmarks/fault_inject_notes.py [--entries 200] [--seed 1]
+"""
+import argparse
+import builtins
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import notes_manager  # noqa: E402
+from notes_index import drop_index, get_index, scan_headers  # noqa: E402
+
+CONTEXT = "electronics"
+CRASH_EXIT_CODE = 17
+
+# name -> (action, text, date, force the temp-file + rename path)
+SCENARIOS = {
+    "append": ("append", "measured 3.3V on the relay coil", None, False),
+    "insert new date": ("insert", "- order flyback diodes", "2030-01-01 09:00:00", False),
+    "update last": ("update", "- rewired the last entry", "last", False),
+    "update middle": ("update", "- rewritten middle entry\n- with two lines", "middle", False),
+    "delete middle": ("delete", "", "middle", False),
+    "update middle (rename path)": ("update", "- rewritten via temp file", "middle", True),
+}
+
+
+def build_notes(directory: str, entries: int):
+    notes_manager.NOTES_DIR = directory
+    path = notes_manager.get_file_path(CONTEXT)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Loose notes before the first entry\n")
+        for i in range(entries):
+            f.write(f"\n## 2025-01-{1 + i % 28:02d} {i // 28:02d}:00:00\n- entry {i}: relay ESP32 wiring\n")
+    return path
+
+
+def resolve_date(path: str, date):
+    dates = [d for _, d in scan_headers(open(path, "rb").read())]
+    return {"last": dates[-1], "middle": dates[len(dates) // 2]}.get(date, date)
+
+
+# --- Child: run one operation, crashing at the Nth I/O step ---
+
+class CrashingFile:
+    """File proxy that counts mutating calls and crashes at the chosen one"""
+
+    def __init__(self, f, injector):
+        self._f = f
+        self._injector = injector
+
+    def write(self, data):
+        def torn():
+            self._f.write(data[:random.randrange(len(data) + 1)])
+            self._f.flush()
+        self._injector.step(torn)
+        return self._f.write(data)
+
+    def truncate(self, *args):
+        self._injector.step()
+        return self._f.truncate(*args)
+
+    def __enter__(self):
+        self._f.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._f.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class Injector:
+    def __init__(self, notes_dir: str, crash_at: int):
+        self.notes_dir = os.path.abspath(notes_dir)
+        self.crash_at = crash_at
+        self.steps = 0
+
+    def step(self, before_crash=None):
+        self.steps += 1
+        if self.steps == self.crash_at:
+            if before_crash is not None:
+                before_crash()
+            os._exit(CRASH_EXIT_CODE)
+
+    def install(self):
+        real_open, real_fdopen = builtins.open, os.fdopen
+        real_fsync, real_replace = os.fsync, os.replace
+        injector = self
+
+        def wrap(f, target):
+            mode = getattr(f, "mode", "r")
+            if isinstance(target, str) and os.path.abspath(target).startswith(injector.notes_dir) \
+                    and any(c in mode for c in "wa+"):
+                return CrashingFile(f, injector)
+            return f
+
+        builtins.open = lambda file, mode="r", *a, **kw: wrap(real_open(file, mode, *a, **kw), file)
+        os.fdopen = lambda fd, mode="r", *a, **kw: CrashingFile(real_fdopen(fd, mode, *a, **kw), injector)
+
+        def fsync(fd):
+            injector.step()
+            return real_fsync(fd)
+
+        def replace(src, dst):
+            injector.step()
+            return real_replace(src, dst)
+
+        os.fsync, os.replace = fsync, replace
+
+
+def run_child(notes_dir: str, scenario: str, crash_at: int, seed: int):
+    random.seed(seed)
+    notes_manager.NOTES_DIR = notes_dir
+    notes_manager.SEMANTIC_SEARCH = False
+    action, text, date, force_rename = SCENARIOS[scenario]
+    if force_rename:
+        notes_manager.JOURNAL_MAX_BYTES = 0
+    date = resolve_date(notes_manager.get_file_path(CONTEXT), date)
+
+    injector = Injector(notes_dir, crash_at)
+    injector.install()
+    notes_manager.process_instruction(CONTEXT, action, text, date)
+    print(injector.steps)
+
+
+# --- Parent ---
+
+def spawn(notes_dir: str, scenario: str, crash_at: int, seed: int) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", notes_dir, scenario, str(crash_at), str(seed)],
+        capture_output=True, text=True
+    )
+
+
+def check_recovered(notes_dir: str, before: bytes, after: bytes) -> str:
+    """Recover like app.py does; returns an error description or ''"""
+    notes_manager.NOTES_DIR = notes_dir
+    notes_manager.recover_journals()
+    path = notes_manager.get_file_path(CONTEXT)
+    data = open(path, "rb").read()
+
+    torn_append = after.startswith(before) and data.startswith(before) and after.startswith(data)
+    if data not in (before, after) and not torn_append:
+        return f"file is neither old nor new ({len(data)} bytes; old {len(before)}, new {len(after)})"
+
+    drop_index(path)
+    index = get_index(path)
+    if list(zip(index.offsets, index.dates)) != scan_headers(data):
+        return "block index disagrees with the file"
+
+    date = scan_headers(data)[-1][1]
+    result = notes_manager.insert_or_update_date_entry(path, date, "- follow-up edit", CONTEXT)
+    if not result["success"] or b"- follow-up edit" not in open(path, "rb").read():
+        return f"follow-up update failed: {result['message']}"
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child", nargs=4, metavar=("DIR", "SCENARIO", "CRASH_AT", "SEED"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        notes_dir, scenario, crash_at, seed = args.child
+        run_child(notes_dir, scenario, int(crash_at), int(seed))
+        return
+
+    workdir = tempfile.mkdtemp()
+    failures = 0
+    try:
+        template = os.path.join(workdir, "template")
+        build_notes(template, args.entries)
+        before = open(notes_manager.get_file_path(CONTEXT), "rb").read()
+
+        for scenario in SCENARIOS:
+            # Clean run: the expected result and how many I/O steps it takes
+            clean = os.path.join(workdir, "clean")
+            shutil.rmtree(clean, ignore_errors=True)
+            shutil.copytree(template, clean)
+            steps = int(spawn(clean, scenario, 0, args.seed).stdout.strip() or 0)
+            notes_manager.NOTES_DIR = clean
+            after = open(notes_manager.get_file_path(CONTEXT), "rb").read()
+
+            scenario_failures = []
+            for crash_at in range(1, steps + 1):
+                trial = os.path.join(workdir, f"trial-{crash_at}")
+                shutil.copytree(template, trial)
+                proc = spawn(trial, scenario, crash_at, args.seed + crash_at)
+                if proc.returncode != CRASH_EXIT_CODE:
+                    scenario_failures.append(f"step {crash_at}: child exited {proc.returncode}: {proc.stderr[-300:]}")
+                else:
+                    error = check_recovered(trial, before, after)
+                    if error:
+                        scenario_failures.append(f"step {crash_at}: {error}")
+                shutil.rmtree(trial)
+
+            failures += len(scenario_failures)
+            status = "ok" if not scenario_failures else f"{len(scenario_failures)} FAILED"
+            print(f"{scenario:<30} {steps:3d} crash points  {status}")
+            for failure in scenario_failures:
+                print(f"    {failure}")
+    finally:
+        shutil.rmtree(workdir)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
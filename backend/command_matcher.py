@@ -0,0 +1,161 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass
+class PhraseMatch:
+    """A command phrase found in a session's transcript stream"""
+    phrase: str
+    start: int  # offset in " ".join(transcriptions)
+    end: int    # exclusive
+
+
+def normalize_char(ch: str) -> str:
+    """Lowercase letters/digits; everything else becomes a word boundary"""
+    return ch.lower() if ch.isalnum() or ch == "'" else " "
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over a fixed list of command phrases.
+
+    Phrases are matched on whole words: text is lowercased, punctuation is
+    treated as whitespace, runs of whitespace collapse to one, and every
+    phrase is padded with a boundary on both sides. Built once and shared by
+    every session's CommandMatcher.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+
+        for phrase in phrases:
+            self._add(phrase)
+        self._build_failure_links()
+
+        self.lengths = [len(self._pattern(p)) for p in self.phrases]
+        # Longest pattern, to know how much position history a matcher keeps
+        self.max_length = max(self.lengths, default=1)
+
+    @staticmethod
+    def _pattern(phrase: str) -> str:
+        words = "".join(normalize_char(ch) for ch in phrase).split()
+        return " " + " ".join(words) + " "
+
+    def _add(self, phrase: str):
+        state = 0
+        for ch in self._pattern(phrase):
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append(len(self.phrases))
+        self.phrases.append(phrase)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def step(self, state: int, ch: str) -> int:
+        while state and ch not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(ch, 0)
+
+
+class CommandMatcher:
+    """
+    Per-session incremental command-phrase matcher.
+
+    feed() scans only the newly appended transcription. Automaton state is
+    carried across utterance boundaries, so a phrase split over two
+    transcriptions ("confirm and" / "submit") is still found. Match offsets
+    refer to " ".join(transcriptions) since the last reset().
+    """
+
+    def __init__(self, automaton: PhraseAutomaton):
+        self.automaton = automaton
+        self.reset()
+
+    def reset(self):
+        """Start a new transcript stream (after a command was dispatched)"""
+        self.state = self.automaton.step(0, " ")
+        self.offset = 0
+        self.last_was_space = True
+        # Original offsets of the most recent normalized characters
+        self.positions: deque = deque(maxlen=self.automaton.max_length)
+        self.positions.append(-1)
+
+    def feed(self, text: str) -> List[PhraseMatch]:
+        """Scan one new transcription and return any phrases completed by it"""
+        matches: List[PhraseMatch] = []
+        # The trailing separator stands in for the " " that joins segments
+        for i, ch in enumerate(text + " "):
+            norm = normalize_char(ch)
+            if norm == " " and self.last_was_space:
+                continue
+            self.last_was_space = norm == " "
+            self.positions.append(self.offset + i)
+            self.state = self.automaton.step(self.state, norm)
+
+            for index in self.automaton.output[self.state]:
+                length = self.automaton.lengths[index]
+                # positions[-length] is the leading boundary; the phrase starts after it
+                start = self.positions[-length + 1]
+                matches.append(PhraseMatch(self.automaton.phrases[index], start, self.offset + i))
+
+        self.offset += len(text) + 1
+        return matches
+
+
+PUNCTUATION = ".,!?;:"
+
+
+def join_cut(left: str, right: str) -> str:
+    """
+    Join the text on either side of a removed span. Only the join is tidied:
+    whitespace around it collapses, and where both sides end/start with
+    punctuation ("done." + ".") the left side's mark is kept.
+    """
+    left, right = left.rstrip(), right.lstrip()
+    marks = len(right) - len(right.lstrip(PUNCTUATION))
+    if not left:
+        return right[marks:].lstrip()
+    if marks and left[-1] in PUNCTUATION:
+        if left[-1] in ",;:" and right[0] in ".!?":
+            # "buy milk," + "." ends the sentence rather than the clause
+            left = left.rstrip(",;:").rstrip()
+        else:
+            right = right[marks:].lstrip()
+    if not right:
+        return left
+    return left + right if right[0] in PUNCTUATION else left + " " + right
+
+
+def strip_spans(text: str, spans: List[Tuple[int, int]]) -> str:
+    """Remove [start, end) spans from text, tidying only where text was cut"""
+    if not spans:
+        return text
+    result = None
+    cursor = 0
+    for start, end in sorted(spans):
+        if start < cursor:
+            start = cursor
+        piece = text[cursor:start]
+        result = piece if result is None else join_cut(result, piece)
+        cursor = max(cursor, end)
+    return join_cut(result, text[cursor:])
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# === ASR Worker Process State ===
+# Only used when ASR runs in a process pool: every worker loads its own copy
+# of the model once, in the initializer.
+_WORKER_MODEL = None
+
+
+def _init_asr_worker(model_name: str):
+    """Load the ASR model inside a pool worker process"""
+    global _WORKER_MODEL
+    import onnx_asr
+    _WORKER_MODEL = onnx_asr.load_model(model_name)
+
+
+def _recognize_in_worker(audio, **kwargs):
+    """Run recognition with the worker process's own model"""
+    return _WORKER_MODEL.recognize(audio, **kwargs)
+
+
+class InferenceExecutor:
+    """
+    Run blocking VAD and ASR inference away from the asyncio event loop.
+
+    VAD gets a small dedicated thread pool. ASR runs either in a thread pool
+    sharing the already loaded model, or in a process pool where each worker
+    loads its own copy. ASR submissions are bounded: once max_asr_pending
+    utterances are queued or running, further callers wait for a slot.
+    """
+
+    def __init__(self, asr_model=None, asr_model_name: Optional[str] = None,
+                 asr_mode: str = "thread", asr_workers: int = 1,
+                 max_asr_pending: int = 8, vad_threads: int = 1):
+        if asr_mode not in ("thread", "process"):
+            raise ValueError(f"Unknown ASR executor mode: '{asr_mode}'. Use 'thread' or 'process'.")
+        if asr_mode == "thread" and asr_model is None:
+            raise ValueError("Thread ASR executor needs a loaded model")
+        if asr_mode == "process" and not asr_model_name:
+            raise ValueError("Process ASR executor needs a model name to load in workers")
+
+        self.asr_model = asr_model
+        self.asr_model_name = asr_model_name
+        self.asr_mode = asr_mode
+        self.asr_workers = asr_workers
+        self.max_asr_pending = max_asr_pending
+        self.vad_threads = vad_threads
+
+        self.vad_pool: Optional[Executor] = None
+        self.asr_pool: Optional[Executor] = None
+        self.asr_slots: Optional[asyncio.Semaphore] = None
+
+        # Metrics
+        self.asr_pending = 0
+        self.asr_completed = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Create the worker pools"""
+        self.vad_pool = ThreadPoolExecutor(
+            max_workers=self.vad_threads, thread_name_prefix="vad"
+        )
+        if self.asr_mode == "process":
+            self.asr_pool = ProcessPoolExecutor(
+                max_workers=self.asr_workers,
+                initializer=_init_asr_worker,
+                initargs=(self.asr_model_name,)
+            )
+        else:
+            self.asr_pool = ThreadPoolExecutor(
+                max_workers=self.asr_workers, thread_name_prefix="asr"
+            )
+        self.asr_slots = asyncio.Semaphore(self.max_asr_pending)
+        logger.info(
+            f"Inference executor started (vad_threads={self.vad_threads}, "
+            f"asr={self.asr_mode} x{self.asr_workers}, max_asr_pending={self.max_asr_pending})"
+        )
+
+    def shutdown(self):
+        """Stop the worker pools without waiting for queued work"""
+        for pool in (self.vad_pool, self.asr_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self.vad_pool = None
+        self.asr_pool = None
+
+    # --- Public API ---
+
+    async def run_vad(self, fn: Callable, *args) -> Any:
+        """Run a VAD call on the VAD thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.vad_pool, fn, *args)
+
+    async def recognize(self, audio, **kwargs) -> Any:
+        """Run ASR on a file path or waveform, waiting for a free slot if the queue is full"""
+        loop = asyncio.get_running_loop()
+        async with self.asr_slots:
+            self.asr_pending += 1
+            try:
+                if self.asr_mode == "process":
+                    result = await asyncio.wrap_future(
+                        self.asr_pool.submit(_recognize_in_worker, audio, **kwargs)
+                    )
+                else:
+                    result = await loop.run_in_executor(
+                        self.asr_pool, lambda: self.asr_model.recognize(audio, **kwargs)
+                    )
+            finally:
+                self.asr_pending -= 1
+            self.asr_completed += 1
+            return result
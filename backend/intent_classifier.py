@@ -0,0 +1,185 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# === Vocabulary (mirrors the intents/contexts/actions in PROMPT_TEMPLATE) ===
+CONTEXTS = ["linux", "electronics", "todolist", "ai", "finance", "general", "work", "personal"]
+
+# Spoken forms that map onto a context name
+CONTEXT_SYNONYMS = {
+    "linux": "linux",
+    "electronics": "electronics",
+    "electronic": "electronics",
+    "todolist": "todolist",
+    "todo list": "todolist",
+    "to do list": "todolist",
+    "to-do list": "todolist",
+    "todo": "todolist",
+    "to-do": "todolist",
+    "task list": "todolist",
+    "tasks": "todolist",
+    "ai": "ai",
+    "a i": "ai",
+    "a.i.": "ai",
+    "artificial intelligence": "ai",
+    "finance": "finance",
+    "finances": "finance",
+    "money": "finance",
+    "general": "general",
+    "work": "work",
+    "personal": "personal",
+}
+
+# Leading verb phrases and the (intent, action) they signal
+INTENT_CUES: List[Tuple[str, str, str]] = [
+    (r"(?:add|put|save|write|record|jot(?: down)?)\s+(?:a\s+)?(?:task|to-?do|reminder)", "manage_tasks", "insert"),
+    (r"remind me to", "manage_tasks", "insert"),
+    (r"(?:add|put|save|write|record|jot(?: down)?|note(?: down)?|log)", "take_notes", "insert"),
+    (r"(?:make|take|create)\s+(?:a\s+)?note", "take_notes", "insert"),
+    (r"append", "take_notes", "append"),
+    (r"(?:update|change|replace)", "update_info", "update"),
+    (r"(?:delete|remove|erase)", "remove_notes", "delete"),
+    (r"(?:search|find|look up|look for)", "search_notes", "search"),
+    (r"(?:read|show)(?: me)?(?: my)?|list (?:my|all)", "read_notes", "read"),
+]
+
+# Submit phrases carry no content and are stripped before classifying
+SUBMIT_PHRASES = ["confirm and submit", "process notes", "save that"]
+
+# How many leading words an intent cue may appear in to count as "formulaic"
+CUE_WINDOW_WORDS = 4
+
+
+def _context_alternation() -> str:
+    names = sorted(CONTEXT_SYNONYMS, key=len, reverse=True)
+    return "|".join(re.escape(n).replace(r"\ ", r"\s+") for n in names)
+
+
+_CTX = _context_alternation()
+# "in the linux category", "to my work notes", "under electronics"
+_CONTEXT_ROUTE = re.compile(
+    rf"\b(?:in|into|to|under|on)\s+(?:the\s+|my\s+)?(?P<ctx>{_CTX})"
+    rf"(?:\s+(?:category|notes?|list|section|file))?\b",
+    re.IGNORECASE
+)
+# "linux category", "work notes" without a preposition
+_CONTEXT_NOUN = re.compile(
+    rf"\b(?P<ctx>{_CTX})\s+(?:category|notes|list|section)\b",
+    re.IGNORECASE
+)
+_CUES = [(re.compile(rf"\b{pattern}\b", re.IGNORECASE), intent, action)
+         for pattern, intent, action in INTENT_CUES]
+_SUBMIT = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in SUBMIT_PHRASES) + r")\b[.!,]?",
+    re.IGNORECASE
+)
+# "this", "to notes", "that in my notes" between the verb and the route
+_ROUTING_FILLER = re.compile(
+    r"^(?:(?:this|that|it)\b\s*)?(?:(?:to|in|into)\s+(?:my\s+|the\s+)?notes?\b)?",
+    re.IGNORECASE
+)
+
+
+class IntentClassifier:
+    """
+    Deterministic fast path for formulaic commands.
+
+    Recognises a leading command verb and an explicitly spoken category
+    ("add to notes in linux category: ...") and produces the same dict shape
+    the LLM returns. Anything ambiguous gets a low confidence so the caller
+    falls back to the LLM. Keeps hit/fallback counters for the bypass rate.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self.hits = 0
+        self.fallbacks = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.fallbacks
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'fallbacks': self.fallbacks,
+            'hit_rate': round(self.hit_rate, 3)
+        }
+
+    def try_classify(self, text: str) -> Optional[Dict[str, Any]]:
+        """Return a classification if confident enough, else None (and count the fallback)"""
+        result = self.classify(text)
+        if result["confidence"] >= self.threshold:
+            self.hits += 1
+            return result
+        self.fallbacks += 1
+        return None
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """Classify text; confidence reflects how formulaic the command was"""
+        cleaned = _SUBMIT.sub(" ", text)
+        cleaned = re.sub(r"\s+", " ", cleaned).strip(" .,!")
+        words = cleaned.split()
+        confidence = 0.5
+
+        # --- Intent: earliest cue wins, it must sit in the first few words ---
+        intent, action = "take_notes", "insert"
+        cue_end = 0
+        cue_hits = []
+        for pattern, cue_intent, cue_action in _CUES:
+            match = pattern.search(cleaned)
+            if match:
+                cue_hits.append((match.start(), match.end(), cue_intent, cue_action))
+        if cue_hits:
+            # Earliest cue, longest match first ("add a task" over "add")
+            start, cue_end, intent, action = min(cue_hits, key=lambda h: (h[0], -h[1]))
+            if len(cleaned[:start].split()) < CUE_WINDOW_WORDS:
+                confidence += 0.15
+            else:
+                confidence -= 0.1
+            if len({hit[2] for hit in cue_hits if hit[2] != "take_notes"} - {intent}) > 0:
+                confidence -= 0.2  # conflicting verbs ("add ... then delete ...")
+        else:
+            confidence -= 0.2
+
+        # --- Context: an explicitly routed category ---
+        routes = list(_CONTEXT_ROUTE.finditer(cleaned)) or list(_CONTEXT_NOUN.finditer(cleaned))
+        contexts = {CONTEXT_SYNONYMS[re.sub(r"\s+", " ", m.group("ctx").lower())] for m in routes}
+        route = None
+        if len(contexts) == 1:
+            context = contexts.pop()
+            confidence += 0.3
+            route = routes[0] if routes[0].start() >= cue_end else None
+        elif len(contexts) > 1:
+            context = CONTEXT_SYNONYMS[re.sub(r"\s+", " ", routes[0].group("ctx").lower())]
+            confidence -= 0.3
+        elif intent == "manage_tasks":
+            context = "todolist"
+            confidence += 0.2
+        else:
+            context = "general"
+
+        # --- Content: the command minus its verb and route ---
+        if route is not None:
+            before = _ROUTING_FILLER.sub("", cleaned[cue_end:route.start()].strip(" :,.-"))
+            before = before.strip(" :,.-")
+            after = cleaned[route.end():].strip(" :,.-")
+            if before and after:
+                confidence -= 0.15  # content wrapped around the route; let the LLM tidy it
+            content = " ".join(part for part in (before, after) if part)
+        else:
+            content = _ROUTING_FILLER.sub("", cleaned[cue_end:].strip(" :,.-")).strip(" :,.-")
+
+        if not content:
+            confidence = 0.0
+        elif len(words) < 3:
+            confidence -= 0.2
+
+        return {
+            "intent": intent,
+            "context": context,
+            "action": action,
+            "text": content,
+            "metadata": {"source": "rules"},
+            "confidence": round(max(0.0, min(confidence, 0.99)), 2)
+        }
@@ -0,0 +1,104 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+from json_repair import repair_json
+
+
+class JsonFieldStream:
+    """
+    Incrementally extract top-level fields from a JSON object arriving in
+    chunks (e.g. LLM tokens).
+
+    feed() returns the (key, value) pairs whose values completed in that
+    chunk, so callers can act on early fields before the whole object has
+    been generated. Anything before the first '{' (code fences, chatter) is
+    skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+
+        # Scanner state at the top level of the object
+        self.key: Optional[str] = None
+        self.value_start: Optional[int] = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.key_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk and return newly completed top-level fields"""
+        self.buffer += chunk
+        completed: List[Tuple[str, Any]] = []
+
+        while self.pos < len(self.buffer) and not self.finished:
+            ch = self.buffer[self.pos]
+
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                self.pos += 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.key is None and self.value_start is None:
+                        # Closing quote of a key
+                        self.key = json.loads(self.buffer[self.key_start:self.pos + 1])
+                        self.key_start = None
+                self.pos += 1
+                continue
+
+            if self.key is None:
+                # Waiting for the next key
+                if ch == '"':
+                    self.in_string = True
+                    self.key_start = self.pos
+                elif ch == "}":
+                    self.finished = True
+                self.pos += 1
+                continue
+
+            if self.value_start is None:
+                # Between key and value
+                if ch not in ": \t\r\n":
+                    self.value_start = self.pos
+                    continue
+                self.pos += 1
+                continue
+
+            # Inside a value
+            if ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                self.depth += 1
+            elif ch in "]}" and self.depth > 0:
+                self.depth -= 1
+            elif self.depth == 0 and ch in ",}":
+                completed.append(self._complete(self.pos))
+                if ch == "}":
+                    self.finished = True
+            self.pos += 1
+
+        return completed
+
+    def _complete(self, end: int) -> Tuple[str, Any]:
+        raw = self.buffer[self.value_start:end].strip()
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = json.loads(repair_json(raw)) if raw else ""
+
+        key = self.key
+        self.key = None
+        self.value_start = None
+        self.depth = 0
+        return key, value
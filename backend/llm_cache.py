@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Punctuation and spacing ASR varies between takes of the same command
+NORMALIZE_DROP = re.compile(r"[^\w\s]+")
+NORMALIZE_SPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Casefold, drop punctuation and collapse whitespace"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = NORMALIZE_DROP.sub(" ", text)
+    return NORMALIZE_SPACE.sub(" ", text).strip()
+
+
+def cache_key(prompt: str, model: str, options: Dict[str, Any]) -> str:
+    """Stable key for a (normalized prompt, model, options) request"""
+    material = json.dumps([normalize_prompt(prompt), model, options], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU cache of LLM responses with a TTL.
+
+    Keys come from cache_key(), so commands that differ only in case,
+    punctuation or spacing share an entry. With persist_path set, entries
+    are appended to a JSON-lines file and reloaded on start; the file is
+    rewritten once it holds twice as many lines as the cache can keep.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 3600.0,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.persist_path = persist_path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (created, response)
+        self._log_lines = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    # --- Lifecycle ---
+
+    def load(self):
+        """Reload persisted entries that are still fresh"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        now = time.time()
+        with self._lock, open(self.persist_path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._log_lines += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                if record.get("response") is None:
+                    self._entries.pop(record["key"], None)
+                elif now - record["created"] < self.ttl_s:
+                    self._entries[record["key"]] = (record["created"], record["response"])
+                    self._entries.move_to_end(record["key"])
+            self._evict()
+        logger.info(f"LLM response cache loaded {len(self._entries)} entries from {self.persist_path}")
+
+    # --- Lookups / Updates ---
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] >= self.ttl_s:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, response: str):
+        created = time.time()
+        with self._lock:
+            self._entries[key] = (created, response)
+            self._entries.move_to_end(key)
+            self._evict()
+            self._persist({"key": key, "created": created, "response": response})
+
+    def invalidate(self, key: str):
+        """Drop an entry, e.g. a response that turned out not to parse"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._persist({"key": key, "response": None})
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions
+        }
+
+    # --- Internals (caller holds the lock) ---
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _persist(self, record: Dict[str, Any]):
+        if not self.persist_path:
+            return
+        try:
+            if self._log_lines >= 2 * self.max_entries:
+                self._compact()
+            with open(self.persist_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self._log_lines += 1
+        except OSError as e:
+            logger.warning(f"Could not persist LLM response cache: {e}")
+
+    def _compact(self):
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (created, response) in self._entries.items():
+                f.write(json.dumps({"key": key, "created": created, "response": response}) + "\n")
+        os.replace(tmp_path, self.persist_path)
+        self._log_lines = len(self._entries)
@@ -0,0 +1,472 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+
+from json_stream import JsonFieldStream
+from llm_cache import ResponseCache, cache_key
+from llm_dispatcher import DeadlineExceeded, LlmDispatcher, PositionCallback
+from llm_pool import Endpoint, EndpointPool
+from llm_resilience import CircuitBreaker, LatencyTracker, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+class FieldCallbackError(Exception):
+    """An on_field callback raised; the request is abandoned without blaming the endpoint"""
+
+    def __init__(self, error: BaseException):
+        super().__init__(str(error))
+        self.error = error
+
+
+class OllamaClient:
+    """
+    Process-wide Ollama client.
+
+    Holds one aiohttp session with a pooled, keep-alive TCP connector for the
+    life of the server, so each prompt reuses an open connection instead of
+    paying for a new connector, DNS lookup and TCP handshake.
+
+    With stream=True responses are read as Ollama's NDJSON token stream and
+    top-level JSON fields are handed to an on_field callback as soon as they
+    complete, before the rest of the object has been generated.
+
+    With a ResponseCache, repeated prompts (same normalized text, model and
+    options) are answered from the cache; on_field still sees every field.
+    With an LlmDispatcher, requests that reach the server go through its
+    bounded, per-session fair queue; cache hits never wait in it.
+
+    api_url may be a list of endpoints; requests are then spread over them
+    by an EndpointPool (least outstanding requests, with health checks).
+    Pass pool to use one built over the same URLs with other settings.
+
+    Failed attempts (timeouts, 5xx, a stream going quiet for stall_timeout_s
+    or closing before its done chunk) are retried up to retries times with
+    jittered backoff, within the request's deadline; on_field only sees
+    fields a previous attempt hadn't already reported. With hedge=True, an attempt still running at the
+    hedge_percentile latency of recent requests gets a duplicate on another
+    endpoint and the first success wins. A CircuitBreaker refuses requests
+    outright while the backend is down; such results carry 'unavailable' so
+    callers can take a local fallback path.
+
+    A fixed instruction block goes in system rather than the prompt. With
+    chat=True requests use /api/chat (system message + user message),
+    otherwise /api/generate's system field; either way every request starts
+    with the same tokens, so Ollama reuses the evaluated prefix from its KV
+    cache. keep_alive keeps the model (and that cache) loaded between
+    sporadic commands, and warm_up() evaluates the prefix at startup.
+    """
+
+    def __init__(self, api_url: Union[str, List[str]], model: str = "gemma3:latest",
+                 options: Optional[Dict[str, Any]] = None,
+                 timeout_s: float = 30.0, connect_timeout_s: float = 5.0,
+                 max_connections: int = 100, max_connections_per_host: int = 16,
+                 keepalive_s: float = 60.0, dns_cache_s: int = 300,
+                 stream: bool = False, cache: Optional[ResponseCache] = None,
+                 dispatcher: Optional[LlmDispatcher] = None, pool: Optional[EndpointPool] = None,
+                 retries: int = 0, retry_base_s: float = 0.25, retry_cap_s: float = 2.0,
+                 stall_timeout_s: Optional[float] = None, hedge: bool = False,
+                 hedge_percentile: float = 95.0, min_hedge_delay_s: float = 0.1,
+                 breaker: Optional[CircuitBreaker] = None, system: Optional[str] = None,
+                 chat: bool = False, keep_alive: Optional[Union[str, int]] = None):
+        self.pool = pool or EndpointPool([api_url] if isinstance(api_url, str) else list(api_url))
+        self.model = model
+        self.options = options or {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s, connect=connect_timeout_s)
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_s = keepalive_s
+        self.dns_cache_s = dns_cache_s
+        self.stream = stream
+        self.cache = cache
+        self.dispatcher = dispatcher
+        self.retries = retries
+        self.retry_base_s = retry_base_s
+        self.retry_cap_s = retry_cap_s
+        self.stall_timeout_s = stall_timeout_s
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay_s = min_hedge_delay_s
+        self.breaker = breaker
+        self.system = system
+        self.chat = chat
+        self.keep_alive = keep_alive
+        self.latency = LatencyTracker()
+        self.first_token = LatencyTracker()
+
+        # Metrics
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Open the pooled HTTP session"""
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_s,
+            ttl_dns_cache=self.dns_cache_s
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        self.pool.start(self.session)
+        logger.info(
+            f"Ollama client started for {', '.join(e.url for e in self.pool.endpoints)} "
+            f"(per_host={self.max_connections_per_host}, keepalive={self.keepalive_s}s)"
+        )
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections"""
+        await self.pool.stop()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # --- Requests ---
+
+    async def generate(self, prompt: str, session_id: str,
+                       on_field: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+                       stream: Optional[bool] = None, deadline: Optional[float] = None,
+                       on_queued: Optional[PositionCallback] = None) -> Dict[str, Any]:
+        """
+        Send a prompt to /api/generate (or answer it from the cache) and return
+        a result dict. deadline is in event-loop time (default: now + timeout);
+        on_queued is told the queue position while waiting for the dispatcher.
+        """
+        if self.cache is None:
+            return await self._dispatch(prompt, session_id, on_field, stream, deadline, on_queued)
+
+        key = self._cache_key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if on_field is not None:
+                for field, value in JsonFieldStream().feed(cached):
+                    await on_field(field, value)
+            return {
+                'success': True,
+                'response': cached,
+                'cached': True,
+                'session_id': session_id
+            }
+
+        result = await self._dispatch(prompt, session_id, on_field, stream, deadline, on_queued)
+        if result['success']:
+            await asyncio.to_thread(self.cache.put, key, result['response'])
+        return result
+
+    async def forget(self, prompt: str):
+        """Drop a cached response for prompt (e.g. one that failed to parse)"""
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.invalidate, self._cache_key(prompt))
+
+    def _cache_key(self, prompt: str) -> str:
+        full_prompt = prompt if self.system is None else self.system + "\n\n" + prompt
+        return cache_key(full_prompt, self.model, self.options)
+
+    async def warm_up(self):
+        """Load the model on every endpoint and evaluate the system prompt once"""
+        if self.session is None:
+            return
+        payload = self._payload("ok", stream=False)
+        payload["options"] = {**self.options, "num_predict": 1}
+
+        async def warm(endpoint: Endpoint):
+            started = time.monotonic()
+            try:
+                async with self.session.post(self._url(endpoint), json=payload) as response:
+                    await response.read()
+                logger.info(f"Warmed up {endpoint.url} in {time.monotonic() - started:.2f}s "
+                            f"(HTTP {response.status})")
+            except Exception as e:
+                logger.warning(f"Warm-up failed for {endpoint.url}: {e}")
+
+        await asyncio.gather(*(warm(e) for e in self.pool.endpoints))
+
+    def _url(self, endpoint: Endpoint) -> str:
+        return endpoint.base_url + ("/api/chat" if self.chat else "/api/generate")
+
+    def _payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.model, "stream": stream, "options": self.options}
+        if self.chat:
+            messages = [{"role": "system", "content": self.system}] if self.system else []
+            payload["messages"] = messages + [{"role": "user", "content": prompt}]
+        else:
+            payload["prompt"] = prompt
+            if self.system:
+                payload["system"] = self.system
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _text(self, chunk: Dict[str, Any]) -> str:
+        """Generated text in a /api/chat or /api/generate reply (or stream chunk)"""
+        if self.chat:
+            return chunk.get("message", {}).get("content", "")
+        return chunk.get("response", "")
+
+    async def _dispatch(self, prompt: str, session_id: str,
+                        on_field: Optional[Callable[[str, Any], Awaitable[None]]],
+                        stream: Optional[bool], deadline: Optional[float],
+                        on_queued: Optional[PositionCallback]) -> Dict[str, Any]:
+        if deadline is None:
+            deadline = asyncio.get_running_loop().time() + self.timeout.total
+        if self.dispatcher is None:
+            return await self._request(prompt, session_id, on_field, stream, deadline)
+        try:
+            return await self.dispatcher.submit(
+                session_id,
+                lambda: self._request(prompt, session_id, on_field, stream, deadline),
+                deadline,
+                on_position=on_queued
+            )
+        except DeadlineExceeded as e:
+            return {
+                'success': False,
+                'error': f"AI request dropped: {e}",
+                'dropped': True,
+                'session_id': session_id
+            }
+
+    async def _request(self, prompt: str, session_id: str,
+                       on_field: Optional[Callable[[str, Any], Awaitable[None]]],
+                       stream: Optional[bool], deadline: float) -> Dict[str, Any]:
+        """Send with retries, hedging and the circuit breaker; deadline bounds every attempt"""
+        if stream is None:
+            stream = self.stream
+
+        if self.session is None:
+            return {
+                'success': False,
+                'error': "AI client not started",
+                'session_id': session_id
+            }
+
+        payload = self._payload(prompt, stream)
+
+        if on_field is not None:
+            # A retried stream regenerates fields the caller already has; only forward new ones
+            delivered = set()
+            forward_field = on_field
+
+            async def on_field(key: str, value: Any):
+                if key not in delivered:
+                    delivered.add(key)
+                    await forward_field(key, value)
+
+        if self.breaker is not None and not self.breaker.allow():
+            return {
+                'success': False,
+                'error': "AI backend unavailable (circuit open)",
+                'unavailable': True,
+                'session_id': session_id
+            }
+
+        loop = asyncio.get_running_loop()
+        try:
+            for attempt in range(self.retries + 1):
+                result, endpoint_ok = await self._hedged(payload, session_id, on_field, deadline)
+                if result['success'] or endpoint_ok:
+                    break
+                delay = backoff_delay(attempt, self.retry_base_s, self.retry_cap_s)
+                if attempt == self.retries or loop.time() + delay >= deadline:
+                    break
+                self.retried += 1
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if self.breaker is not None:
+                self.breaker.abandon()
+            raise
+        except FieldCallbackError as e:
+            # The caller's callback failed (e.g. its client went away): not an endpoint fault
+            if self.breaker is not None:
+                self.breaker.abandon()
+            raise e.error
+
+        if self.breaker is not None:
+            self.breaker.record(endpoint_ok)
+        if not endpoint_ok:
+            result['unavailable'] = True
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self.pool.endpoints) < 2:
+            return None
+        typical = self.latency.percentile(self.hedge_percentile)
+        return None if typical is None else max(typical, self.min_hedge_delay_s)
+
+    async def _hedged(self, payload: Dict[str, Any], session_id: str,
+                      on_field: Optional[Callable[[str, Any], Awaitable[None]]],
+                      deadline: float) -> Tuple[Dict[str, Any], bool]:
+        """One attempt, plus a duplicate on another endpoint if it runs slower than usual"""
+        hedge_after = self._hedge_delay()
+        first = self.pool.acquire()
+        if hedge_after is None:
+            return await self._attempt(first, payload, session_id, on_field, deadline)
+
+        # Only the attempt that produces a field first reports fields
+        owner: List[int] = []
+
+        def relay(i: int):
+            if on_field is None:
+                return None
+
+            async def forward(key: str, value: Any):
+                if not owner:
+                    owner.append(i)
+                if owner[0] == i:
+                    await on_field(key, value)
+            return forward
+
+        primary = asyncio.create_task(self._attempt(first, payload, session_id, relay(0), deadline))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                second = self.pool.acquire(exclude=first)
+                if second is not None:
+                    self.hedged += 1
+                    tasks.append(asyncio.create_task(
+                        self._attempt(second, payload, session_id, relay(1), deadline)
+                    ))
+            # First success wins; a failure waits for the other attempt
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if outcome[0]['success']:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return outcome
+            return outcome
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, endpoint: Endpoint, payload: Dict[str, Any], session_id: str,
+                       on_field: Optional[Callable[[str, Any], Awaitable[None]]],
+                       deadline: float) -> Tuple[Dict[str, Any], bool]:
+        """One request to one endpoint, reported to the pool"""
+        remaining = max(deadline - asyncio.get_running_loop().time(), 0.001)
+        # A non-streamed reply sends nothing until generation ends, so only streams can stall
+        timeout = aiohttp.ClientTimeout(total=min(remaining, self.timeout.total),
+                                        connect=self.timeout.connect,
+                                        sock_read=self.stall_timeout_s if payload["stream"] else None)
+        started = time.monotonic()
+        try:
+            result, endpoint_ok = await self._post(self._url(endpoint), payload, session_id, on_field,
+                                                   payload["stream"], timeout)
+        except (asyncio.CancelledError, FieldCallbackError):
+            self.pool.release(endpoint, None, 0.0)
+            raise
+        elapsed = time.monotonic() - started
+        self.pool.release(endpoint, endpoint_ok, elapsed)
+        if result['success']:
+            self.latency.record(elapsed)
+        return result, endpoint_ok
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        ttft = self.first_token.percentile(50)
+        return {
+            'retries': self.retried,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'p95_latency_s': round(p95, 3) if p95 is not None else None,
+            'p50_first_token_s': round(ttft, 3) if ttft is not None else None,
+            'breaker': self.breaker.stats() if self.breaker is not None else None
+        }
+
+    async def _post(self, url: str, payload: Dict[str, Any], session_id: str,
+                    on_field: Optional[Callable[[str, Any], Awaitable[None]]],
+                    stream: bool, timeout: aiohttp.ClientTimeout) -> Tuple[Dict[str, Any], bool]:
+        """POST one request; also returns whether the endpoint itself behaved"""
+        started = time.monotonic()
+        try:
+            async with self.session.post(url, json=payload, timeout=timeout) as response:
+                if response.status == 200 and stream:
+                    result = await self._read_stream(response, session_id, on_field, started)
+                    return result, result['success']
+                elif response.status == 200:
+                    data = await response.json()
+                    return {
+                        'success': True,
+                        'response': self._text(data),
+                        'session_id': session_id
+                    }, True
+                else:
+                    error_text = await response.text()
+                    return {
+                        'success': False,
+                        'error': f"HTTP {response.status}: {error_text}",
+                        'session_id': session_id
+                    }, response.status < 500 and response.status != 404
+        except FieldCallbackError:
+            raise
+        except asyncio.TimeoutError:
+            return {
+                'success': False,
+                'error': "AI query timeout",
+                'session_id': session_id
+            }, False
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"AI query failed: {str(e)}",
+                'session_id': session_id
+            }, False
+
+    async def _read_stream(self, response, session_id: str,
+                           on_field: Optional[Callable[[str, Any], Awaitable[None]]],
+                           started: Optional[float]) -> Dict[str, Any]:
+        """Consume an NDJSON token stream, reporting JSON fields as they complete"""
+        fields = JsonFieldStream()
+        parts = []
+
+        async for line in response.content:
+            line = line.strip()
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                return {
+                    'success': False,
+                    'error': f"AI stream error: {chunk['error']}",
+                    'session_id': session_id
+                }
+
+            token = self._text(chunk)
+            if token and started is not None:
+                self.first_token.record(time.monotonic() - started)
+                started = None
+            parts.append(token)
+            if on_field is not None and token:
+                for key, value in fields.feed(token):
+                    try:
+                        await on_field(key, value)
+                    except Exception as e:
+                        raise FieldCallbackError(e) from e
+
+            if chunk.get("done"):
+                break
+        else:
+            # The connection closed before Ollama said it was done: a truncated reply
+            return {
+                'success': False,
+                'error': "AI stream ended before completion",
+                'session_id': session_id
+            }
+
+        return {
+            'success': True,
+            'response': "".join(parts),
+            'session_id': session_id
+        }
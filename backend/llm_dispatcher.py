@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import math
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (position, estimated_wait_s) whenever a queued request moves
+PositionCallback = Callable[[int, float], Awaitable[None]]
+
+
+class DeadlineExceeded(Exception):
+    """A queued request could not have finished before its deadline"""
+
+
+class _Waiter:
+    def __init__(self, session_id: str, deadline: float, future: asyncio.Future):
+        self.session_id = session_id
+        self.deadline = deadline
+        self.future = future            # resolved with None when a slot is granted
+        self.moved = asyncio.Event()    # set when position changes
+        self.position = -1
+
+
+class LlmDispatcher:
+    """
+    Bounds the number of LLM requests in flight and queues the rest.
+
+    Waiting requests are kept in one FIFO per session and granted slots
+    round-robin across sessions, so one chatty client can't starve the
+    others. Each request carries a deadline (event-loop time); the expected
+    finish time is estimated from its queue position and a moving average of
+    recent request durations, and a request that can no longer make its
+    deadline is dropped with DeadlineExceeded instead of being sent late.
+    """
+
+    def __init__(self, max_in_flight: int = 4, initial_service_s: float = 3.0,
+                 service_smoothing: float = 0.2):
+        self.max_in_flight = max_in_flight
+        self.service_s = initial_service_s
+        self.service_smoothing = service_smoothing
+
+        self.waiting: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.in_flight = 0
+
+        # Metrics
+        self.dispatched = 0
+        self.dropped = 0
+        self.max_queue_wait_s = 0.0
+
+    # --- Public API ---
+
+    async def submit(self, session_id: str, call: Callable[[], Awaitable[Any]],
+                     deadline: float, on_position: Optional[PositionCallback] = None) -> Any:
+        """Run call() once a slot is free; raises DeadlineExceeded if it can't finish in time"""
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+
+        if self.in_flight >= self.max_in_flight or self.waiting:
+            waiter = _Waiter(session_id, deadline, loop.create_future())
+            self.waiting.setdefault(session_id, deque()).append(waiter)
+            self._reposition()
+            try:
+                await self._wait_turn(waiter, on_position)
+            except BaseException:
+                self._discard(waiter)
+                raise
+            self.max_queue_wait_s = max(self.max_queue_wait_s, loop.time() - queued_at)
+        else:
+            self.in_flight += 1
+
+        started = loop.time()
+        try:
+            if started + self.service_s > deadline:
+                self.dropped += 1
+                raise DeadlineExceeded(
+                    f"LLM request would finish in ~{self.service_s:.1f}s, "
+                    f"past its deadline ({deadline - started:.1f}s left)"
+                )
+            self.dispatched += 1
+            result = await call()
+            elapsed = loop.time() - started
+            self.service_s += self.service_smoothing * (elapsed - self.service_s)
+            return result
+        finally:
+            self.in_flight -= 1
+            self._grant()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self.waiting.values())
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the request at queue position (0 = next) starts"""
+        return math.ceil((position + 1) / self.max_in_flight) * self.service_s
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'dispatched': self.dispatched,
+            'dropped': self.dropped,
+            'avg_service_s': round(self.service_s, 3),
+            'max_queue_wait_s': round(self.max_queue_wait_s, 3)
+        }
+
+    # --- Queue ---
+
+    async def _wait_turn(self, waiter: _Waiter, on_position: Optional[PositionCallback]):
+        loop = asyncio.get_running_loop()
+        reported = None
+        while not waiter.future.done():
+            # Start time if every request ahead of us takes the average time
+            expected_start = loop.time() + self.estimated_wait(waiter.position)
+            if expected_start + self.service_s > waiter.deadline:
+                self.dropped += 1
+                raise DeadlineExceeded(
+                    f"LLM queue position {waiter.position + 1} can't finish before its deadline"
+                )
+            if on_position is not None and waiter.position != reported:
+                reported = waiter.position
+                await on_position(waiter.position, self.estimated_wait(waiter.position))
+                continue
+            waiter.moved.clear()
+            moved = asyncio.ensure_future(waiter.moved.wait())
+            try:
+                # Wake up when the deadline check above would fail if nothing moved
+                drop_at = waiter.deadline - self.service_s - self.estimated_wait(waiter.position)
+                await asyncio.wait(
+                    {waiter.future, moved},
+                    timeout=max(0.0, drop_at - loop.time()) + 0.001,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                moved.cancel()
+        # A slot was handed to us; the caller now owns it
+        waiter.future.result()
+
+    def _order(self) -> List[_Waiter]:
+        """Waiters in the order round-robin will grant them"""
+        queues = list(self.waiting.values())
+        order = []
+        depth = 0
+        while True:
+            row = [q[depth] for q in queues if len(q) > depth]
+            if not row:
+                return order
+            order.extend(row)
+            depth += 1
+
+    def _reposition(self):
+        for position, waiter in enumerate(self._order()):
+            if waiter.position != position:
+                waiter.position = position
+                waiter.moved.set()
+
+    def _grant(self):
+        """Hand free slots to the next sessions in rotation"""
+        while self.in_flight < self.max_in_flight and self.waiting:
+            session_id, queue = next(iter(self.waiting.items()))
+            waiter = queue.popleft()
+            del self.waiting[session_id]
+            if queue:
+                self.waiting[session_id] = queue  # back of the rotation
+            self.in_flight += 1
+            waiter.future.set_result(None)
+        self._reposition()
+
+    def _discard(self, waiter: _Waiter):
+        """Forget a waiter that gave up; return its slot if one was already granted"""
+        queue = self.waiting.get(waiter.session_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self.waiting[waiter.session_id]
+            self._reposition()
+        elif waiter.future.done() and not waiter.future.cancelled():
+            self.in_flight -= 1
+            self._grant()
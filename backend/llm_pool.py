@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import random
+import time
+from statistics import median
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """One Ollama backend and what the pool has observed about it"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.base_url = url.rsplit("/api/", 1)[0]
+        self.health_url = self.base_url + "/api/tags"
+        self.outstanding = 0
+        self.latency_s: Optional[float] = None   # moving average of successful requests
+        self.failures = 0                        # consecutive
+        self.ejections = 0                       # recent, for backoff
+        self.ejected_until: Optional[float] = None
+        self.reinstated_at = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until is None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'latency_s': round(self.latency_s, 3) if self.latency_s is not None else None,
+            'requests': self.requests,
+            'errors': self.errors,
+            'ejections': self.ejections
+        }
+
+
+class EndpointPool:
+    """
+    Spreads LLM requests over several Ollama endpoints.
+
+    Each request goes to the healthy endpoint with the fewest outstanding
+    requests (ties: lower average latency). Endpoints are ejected for
+    at least ejection_s, doubling on each repeat, after max_failures
+    consecutive errors (passive check) or when their average latency is more
+    than slow_factor times the median of their peers. Every health_interval_s
+    endpoints are probed with GET /api/tags (active check): a healthy one
+    that fails is ejected, and an ejected one whose time is up returns on
+    its first successful probe. If every endpoint is ejected, the one due
+    back soonest is used anyway.
+    """
+
+    def __init__(self, urls: List[str], max_failures: int = 3, ejection_s: float = 10.0,
+                 max_ejection_s: float = 300.0, slow_factor: float = 3.0,
+                 health_interval_s: float = 5.0, health_timeout_s: float = 2.0,
+                 latency_smoothing: float = 0.2):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one URL")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.max_failures = max_failures
+        self.ejection_s = ejection_s
+        self.max_ejection_s = max_ejection_s
+        self.slow_factor = slow_factor
+        self.health_interval_s = health_interval_s
+        self.health_timeout = aiohttp.ClientTimeout(total=health_timeout_s)
+        self.latency_smoothing = latency_smoothing
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+
+    # --- Lifecycle ---
+
+    def start(self, session: aiohttp.ClientSession):
+        """Start active health checks using the client's HTTP session"""
+        self.session = session
+        if len(self.endpoints) > 1:
+            self.task = asyncio.create_task(self._health_loop())
+        logger.info(f"Ollama endpoint pool started with {len(self.endpoints)} endpoint(s)")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    # --- Routing ---
+
+    def acquire(self, exclude: Optional[Endpoint] = None) -> Optional[Endpoint]:
+        """
+        Pick an endpoint for one request; pair with release(). With exclude
+        (a hedged duplicate) only another healthy endpoint is returned, or None.
+        """
+        candidates = [e for e in self.endpoints if e.healthy and e is not exclude]
+        if candidates:
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.latency_s or 0.0, random.random()))
+        elif exclude is not None:
+            return None
+        else:
+            endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        return endpoint
+
+    def release(self, endpoint: Endpoint, ok: Optional[bool], elapsed_s: float):
+        """Record a finished request (passive health check); ok=None for one abandoned by the caller"""
+        endpoint.outstanding -= 1
+        if ok is None:
+            return
+        if not ok:
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures and endpoint.healthy:
+                self._eject(endpoint, f"{endpoint.failures} consecutive failures")
+            return
+
+        endpoint.failures = 0
+        if endpoint.latency_s is None:
+            endpoint.latency_s = elapsed_s
+        else:
+            endpoint.latency_s += self.latency_smoothing * (elapsed_s - endpoint.latency_s)
+        self._check_slow(endpoint)
+
+    def _check_slow(self, endpoint: Endpoint):
+        peers = [e.latency_s for e in self.endpoints
+                 if e is not endpoint and e.healthy and e.latency_s is not None]
+        if not peers or not endpoint.healthy:
+            return
+        typical = median(peers)
+        if endpoint.latency_s > self.slow_factor * typical:
+            self._eject(endpoint, f"avg latency {endpoint.latency_s:.2f}s vs {typical:.2f}s for its peers")
+
+    def _eject(self, endpoint: Endpoint, reason: str):
+        # Never eject the last healthy endpoint for being slow or flaky; it's all we have
+        if endpoint.healthy and not any(e.healthy for e in self.endpoints if e is not endpoint):
+            return
+        now = time.monotonic()
+        if endpoint.healthy and now - endpoint.reinstated_at > self.max_ejection_s:
+            endpoint.ejections = 0  # well behaved for a while: start the backoff over
+        duration = min(self.ejection_s * 2 ** endpoint.ejections, self.max_ejection_s)
+        endpoint.ejections += 1
+        endpoint.ejected_until = now + duration
+        logger.warning(f"Ejecting Ollama endpoint {endpoint.url} for {duration:.0f}s: {reason}")
+
+    def _reinstate(self, endpoint: Endpoint):
+        logger.info(f"Ollama endpoint {endpoint.url} passed its health check, back in rotation")
+        endpoint.ejected_until = None
+        endpoint.reinstated_at = time.monotonic()
+        endpoint.failures = 0
+        # Forget the slow history; it's re-measured from fresh requests
+        endpoint.latency_s = None
+
+    # --- Active Health Checks ---
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval_s)
+            now = time.monotonic()
+            due = [e for e in self.endpoints if e.healthy or now >= e.ejected_until]
+            await asyncio.gather(*(self._probe(e) for e in due))
+
+    async def _probe(self, endpoint: Endpoint):
+        try:
+            async with self.session.get(endpoint.health_url, timeout=self.health_timeout) as response:
+                ok = response.status == 200
+                reason = f"health check returned HTTP {response.status}"
+        except Exception as e:
+            ok = False
+            reason = f"health check failed: {e or type(e).__name__}"
+        if ok and not endpoint.healthy:
+            self._reinstate(endpoint)
+        elif not ok:
+            self._eject(endpoint, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        return {e.url: e.stats() for e in self.endpoints}
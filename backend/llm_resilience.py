@@ -0,0 +1,96 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base_s: float, cap_s: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0.0, min(cap_s, base_s * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Recent successful request latencies, for the hedging delay"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency_s: float):
+        self.samples.append(latency_s)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of the window, or None until min_samples are in"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend that keeps failing.
+
+    Closed: requests go through; failure_threshold consecutive failures open
+    the circuit. Open: requests are refused for reset_s, so callers fall back
+    at once instead of waiting out timeouts. Half-open: after reset_s one
+    trial request is let through; success closes the circuit, failure opens
+    it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_s: float = 15.0):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+        # Metrics
+        self.opens = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; pair an allowed request with record()"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool):
+        self.trial_in_flight = False
+        if success:
+            if self.state != self.CLOSED:
+                logger.info("LLM circuit closed: backend answered again")
+            self.state = self.CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+                logger.warning(f"LLM circuit open for {self.reset_s:.0f}s after {self.failures} failure(s)")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def abandon(self):
+        """An allowed request was cancelled before it could succeed or fail"""
+        self.trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'opens': self.opens,
+            'rejected': self.rejected
+        }
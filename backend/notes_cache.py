@@ -0,0 +1,237 @@
+import bisect
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+Stamp = Tuple[int, int, int]  # (size, mtime_ns, inode)
+
+
+def is_header(offsets: List[int], offset: int) -> bool:
+    k = bisect.bisect_left(offsets, offset)
+    return k < len(offsets) and offsets[k] == offset
+
+
+def file_stamp(filepath: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class ParsedDocument:
+    """
+    A context file (or its tail) split into date blocks.
+
+    chunks[i] holds the bytes from starts[i] up to the next chunk: every chunk
+    but a leading preamble (starts[0] == 0) begins at a "## <date>" header.
+    Only the file from base onward is held; a write only ever needs the file
+    from its first affected block, so that is all a cache miss reads.
+    """
+
+    def __init__(self, base: int, data: bytes, offsets: List[int]):
+        self.starts: List[int] = []
+        self.chunks: List[bytes] = []
+        self._split(base, data, offsets)
+
+    @property
+    def base(self) -> int:
+        return self.starts[0]
+
+    @property
+    def size(self) -> int:
+        return self.starts[-1] + len(self.chunks[-1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.size - self.base
+
+    def _split(self, base: int, data: bytes, offsets: List[int]):
+        """Append chunks for data (the file from base on), cut at the header offsets"""
+        end = base + len(data)
+        cuts = [base] + [o for o in offsets[bisect.bisect_right(offsets, base):] if o < end]
+        for a, b in zip(cuts, cuts[1:] + [end]):
+            self.starts.append(a)
+            self.chunks.append(data[a - base:b - base])
+
+    def _chunk_at(self, offset: int) -> int:
+        return max(bisect.bisect_right(self.starts, offset) - 1, 0)
+
+    def tail(self, start: int) -> bytes:
+        """The file's bytes from start (>= base) to EOF"""
+        i = self._chunk_at(start)
+        return self.chunks[i][start - self.starts[i]:] + b"".join(self.chunks[i + 1:])
+
+    def whitespace_start(self, end: int) -> int:
+        """Where the run of whitespace ending at end begins, or base if it reaches that far"""
+        pos = end
+        i = self._chunk_at(end)
+        while pos > self.base:
+            while i and pos <= self.starts[i]:
+                i -= 1
+            if not self.chunks[i][pos - 1 - self.starts[i]:pos - self.starts[i]].isspace():
+                break
+            pos -= 1
+        return pos
+
+    def prepend(self, base: int, data: bytes, offsets: List[int]):
+        """Add the file's bytes [base, self.base) in front"""
+        starts, chunks = self.starts, self.chunks
+        self.starts, self.chunks = [], []
+        self._split(base, data, offsets)
+        self.starts += starts
+        self.chunks += chunks
+
+    def splice(self, start: int, new_tail: bytes, offsets: List[int]) -> bool:
+        """
+        Apply file[start:] = new_tail, re-cutting the changed part at the
+        file's new header offsets. Returns False if the document can no
+        longer be kept block-aligned (its first block lost its header).
+        """
+        j = self._chunk_at(start)
+        i = j
+        while i and not is_header(offsets, self.starts[i]):
+            i -= 1
+        anchor = self.starts[i]
+        if anchor and not is_header(offsets, anchor):
+            return False
+        data = b"".join(self.chunks[i:j + 1])[:start - anchor] + new_tail
+        del self.starts[i:], self.chunks[i:]
+        self._split(anchor, data, offsets)
+        return True
+
+
+class DocumentCache:
+    """
+    LRU cache of parsed context documents, bounded by total bytes.
+
+    Every lookup re-checks the file's size, mtime and inode, so edits made
+    outside notes_manager (or a file replaced by rename) are picked up.
+    notes_manager writes through the cache after each write, so touching the
+    same context again costs a stat instead of a read. A miss reads only the
+    blocks the command needs (located through the date-block index).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[str, Tuple[Stamp, ParsedDocument]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filepath: str) -> Optional[ParsedDocument]:
+        """Cached document if it still matches the file, else None"""
+        stamp = file_stamp(filepath)
+        with self._lock:
+            entry = self._docs.get(filepath)
+            if entry is None or stamp is None or entry[0] != stamp:
+                if entry is not None:
+                    self._drop(filepath)
+                return None
+            self._docs.move_to_end(filepath)
+            return entry[1]
+
+    def open(self, filepath: str, index, start: int) -> ParsedDocument:
+        """
+        Document holding at least the file from start to EOF. index is the
+        file's up-to-date DateBlockIndex; on a miss (or a cached tail that
+        starts too late) only the blocks from the one containing start are read.
+        """
+        k = bisect.bisect_right(index.offsets, start) - 1
+        anchor = index.offsets[k] if k >= 0 else 0
+
+        doc = self.get(filepath)
+        if doc is not None and doc.size == index.size and doc.base <= start:
+            self.hits += 1
+            return doc
+
+        self.misses += 1
+        end = doc.base if doc is not None and doc.size == index.size else index.size
+        with open(filepath, "rb") as f:
+            f.seek(anchor)
+            data = f.read(end - anchor)
+        if len(data) != end - anchor:
+            raise IOError(f"{filepath} changed while it was being read")
+        if end == index.size:
+            doc = ParsedDocument(anchor, data, index.offsets)
+            self._put(filepath, doc)
+        else:
+            self._resize(filepath, doc, lambda: doc.prepend(anchor, data, index.offsets))
+        return doc
+
+    def load(self, filepath: str, index) -> bytes:
+        """Whole contents of filepath, from the cache or read (and cached) in one go"""
+        return self.open(filepath, index, 0).tail(0)
+
+    def write_through(self, filepath: str, doc: ParsedDocument, start: int, new_tail: bytes,
+                      offsets: List[int]):
+        """
+        Apply a write (file[start:] = new_tail) to doc, the document opened
+        for it, and re-stamp it. offsets are the file's header offsets after
+        the write. A doc that isn't cached (too large, evicted) is ignored.
+        """
+        if not self._resize(filepath, doc, lambda: doc.splice(start, new_tail, offsets)):
+            return
+        stamp = file_stamp(filepath)
+        with self._lock:
+            entry = self._docs.get(filepath)
+            if entry is None or entry[1] is not doc:
+                return
+            if stamp is None or stamp[0] != doc.size:
+                self._drop(filepath)
+            else:
+                self._docs[filepath] = (stamp, doc)
+
+    def invalidate(self, filepath: str):
+        with self._lock:
+            self._drop(filepath)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'documents': len(self._docs),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _resize(self, filepath: str, doc: ParsedDocument, change) -> bool:
+        """Run change() on doc, keeping the byte count right if doc is cached"""
+        with self._lock:
+            entry = self._docs.get(filepath)
+            cached = entry is not None and entry[1] is doc
+            if cached:
+                self.total_bytes -= doc.nbytes
+            kept = change() is not False
+            if not cached:
+                return False
+            if not kept:
+                del self._docs[filepath]
+                return False
+            self.total_bytes += doc.nbytes
+            if doc.nbytes > self.max_bytes:
+                self._drop(filepath)
+                return False
+            self._evict()
+            return filepath in self._docs
+
+    def _put(self, filepath: str, doc: ParsedDocument):
+        stamp = file_stamp(filepath)
+        with self._lock:
+            self._drop(filepath)
+            if stamp is None or stamp[0] != doc.size or doc.nbytes > self.max_bytes:
+                return
+            self._docs[filepath] = (stamp, doc)
+            self.total_bytes += doc.nbytes
+            self._evict()
+
+    def _drop(self, filepath: str):
+        entry = self._docs.pop(filepath, None)
+        if entry is not None:
+            self.total_bytes -= entry[1].nbytes
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._docs:
+            _, (_, doc) = self._docs.popitem(last=False)
+            self.total_bytes -= doc.nbytes
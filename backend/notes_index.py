@@ -0,0 +1,227 @@
+import bisect
+import itertools
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# === CONFIG ===
+INDEX_SUFFIX = ".idx"          # index lives next to the context file: todolist.txt.idx
+INDEX_MAGIC = b"EIDX1"
+INDEX_HEADER_SIZE = 64         # fixed width so it can be rewritten in place
+
+# A date block starts at a line beginning with "## YYYY-MM-DD..."; the rest of
+# the header line (stripped) is the block's date key.
+HEADER_PATTERN = re.compile(rb"^##[ \t]*(\d{4}-\d{2}-\d{2}[^\r\n]*?)[ \t]*\r?$", re.MULTILINE)
+
+
+def scan_headers(data: bytes, base: int = 0) -> List[Tuple[int, str]]:
+    """Return (absolute offset, date) for every block header in data"""
+    return [(base + m.start(), m.group(1).decode("utf-8", "replace"))
+            for m in HEADER_PATTERN.finditer(data)]
+
+
+def split_blocks(data: bytes) -> List[Tuple[Optional[str], str]]:
+    """
+    Split a context file into (date, text) entries in file order. Text before
+    the first header comes back with date None; block text excludes the header.
+    """
+    headers = scan_headers(data)
+    entries: List[Tuple[Optional[str], str]] = []
+    preamble = data[:headers[0][0] if headers else len(data)].strip()
+    if preamble:
+        entries.append((None, preamble.decode("utf-8", "replace")))
+    for k, (offset, date) in enumerate(headers):
+        end = headers[k + 1][0] if k + 1 < len(headers) else len(data)
+        _, _, body = data[offset:end].partition(b"\n")
+        entries.append((date, body.strip().decode("utf-8", "replace")))
+    return entries
+
+
+class DateBlockIndex:
+    """
+    Byte-offset index of the "## <date>" blocks in one context file.
+
+    Persisted next to the .txt as a fixed-width header line holding the
+    file's size and mtime, followed by one "<offset> <date>" line per block.
+    An index whose recorded size/mtime no longer match the file is stale and
+    is rebuilt with a single scan. Edits only rewrite index lines from the
+    first block they touched, so appending a block appends one line.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.index_path = filepath + INDEX_SUFFIX
+        self.size = 0
+        self.mtime_ns = 0
+        self.offsets: List[int] = []
+        self.dates: List[str] = []
+        self.by_date: Dict[str, List[int]] = {}
+        # Byte position in the index file where each entry line ends
+        self.line_ends: List[int] = []
+
+    # --- Freshness ---
+
+    def matches(self, st: os.stat_result) -> bool:
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+    def _stamp(self):
+        st = os.stat(self.filepath)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+
+    # --- Lookup ---
+
+    def find(self, date: str) -> List[int]:
+        """Block numbers whose header date equals date"""
+        return list(self.by_date.get(date, ()))
+
+    def _index_dates(self):
+        self.by_date = {}
+        for k, date in enumerate(self.dates):
+            self.by_date.setdefault(date, []).append(k)
+
+    def span(self, k: int) -> Tuple[int, int]:
+        """Byte range of block k: its header up to (not including) the newline before the next header"""
+        start = self.offsets[k]
+        end = self.offsets[k + 1] - 1 if k + 1 < len(self.offsets) else self.size
+        return start, end
+
+    def first_at_or_after(self, offset: int) -> int:
+        return bisect.bisect_left(self.offsets, offset)
+
+    # --- Persistence ---
+
+    def _header(self) -> bytes:
+        line = INDEX_MAGIC + b" %020d %020d" % (self.size, self.mtime_ns)
+        return line.ljust(INDEX_HEADER_SIZE - 1) + b"\n"
+
+    def load(self) -> bool:
+        """Read the persisted index; returns False if missing or unreadable"""
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+
+        header = data[:INDEX_HEADER_SIZE].split()
+        if len(header) != 3 or header[0] != INDEX_MAGIC:
+            return False
+
+        self.offsets, self.dates, self.line_ends = [], [], []
+        position = INDEX_HEADER_SIZE
+        try:
+            self.size, self.mtime_ns = int(header[1]), int(header[2])
+            for line in data[INDEX_HEADER_SIZE:].splitlines(keepends=True):
+                offset, _, date = line.rstrip(b"\n").partition(b" ")
+                position += len(line)
+                self.offsets.append(int(offset))
+                self.dates.append(date.decode("utf-8"))
+                self.line_ends.append(position)
+        except ValueError:
+            # Torn or corrupt index file; the caller rebuilds it
+            return False
+        self._index_dates()
+        return True
+
+    def rebuild(self):
+        """Scan the context file from scratch and persist a fresh index"""
+        try:
+            with open(self.filepath, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+
+        entries = scan_headers(data)
+        self.offsets = [offset for offset, _ in entries]
+        self.dates = [date for _, date in entries]
+        self.line_ends = []
+        self._index_dates()
+        if os.path.exists(self.filepath):
+            self._stamp()
+        else:
+            self.size, self.mtime_ns = 0, 0
+        self._persist_from(0)
+
+    def replace_from(self, offset: int, entries: List[Tuple[int, str]]):
+        """
+        Drop entries at or after offset, add the given ones, then re-stamp
+        and persist. Called after the file was rewritten from offset onward.
+        """
+        self.splice(offset, self.size, entries, 0)
+
+    def splice(self, start: int, end: int, entries: List[Tuple[int, str]], delta: int):
+        """
+        Replace the entries in [start, end) with the given ones and move the
+        entries at or after end by delta bytes, then re-stamp and persist.
+        Called after the file was rewritten from start onward with the bytes
+        from end shifted but otherwise unchanged.
+        """
+        k = self.first_at_or_after(start)
+        j = self.first_at_or_after(end) if end < self.size else len(self.offsets)
+
+        if j == len(self.offsets) or j - k == len(entries):
+            # Block numbers outside [k, j) keep their meaning; patch by_date in place
+            for n in range(k, j):
+                self.by_date[self.dates[n]].remove(n)
+                if not self.by_date[self.dates[n]]:
+                    del self.by_date[self.dates[n]]
+            for n, (_, date) in enumerate(entries, start=k):
+                bisect.insort(self.by_date.setdefault(date, []), n)
+            renumbered = False
+        else:
+            renumbered = True
+
+        self.offsets[k:] = [o for o, _ in entries] + [o + delta for o in self.offsets[j:]]
+        self.dates[k:j] = [d for _, d in entries]
+        if renumbered:
+            self._index_dates()
+        self._stamp()
+        self._persist_from(k)
+
+    def _persist_from(self, k: int):
+        """Rewrite index lines from entry k onward and refresh the header"""
+        start = self.line_ends[k - 1] if k > 0 else INDEX_HEADER_SIZE
+        lines = ["%d %s\n" % entry for entry in zip(self.offsets[k:], self.dates[k:])]
+
+        mode = "r+b" if os.path.exists(self.index_path) and k > 0 else "wb"
+        with open(self.index_path, mode) as f:
+            # Header last: until it carries the new stamp, a torn index reads as stale
+            f.seek(start)
+            f.write("".join(lines).encode("utf-8"))
+            f.truncate()
+            f.seek(0)
+            f.write(self._header())
+
+        del self.line_ends[k:]
+        lengths = (len(line) if line.isascii() else len(line.encode("utf-8")) for line in lines)
+        self.line_ends.extend(position + start for position in itertools.accumulate(lengths))
+
+
+# --- Index Cache ---
+_INDEXES: Dict[str, DateBlockIndex] = {}
+
+
+def get_index(filepath: str) -> DateBlockIndex:
+    """
+    Return an up-to-date index for filepath: the in-memory copy if it still
+    matches the file, else the persisted one if that matches, else a rebuild.
+    """
+    try:
+        st: Optional[os.stat_result] = os.stat(filepath)
+    except FileNotFoundError:
+        st = None
+
+    index = _INDEXES.get(filepath)
+    if index is not None and st is not None and index.matches(st):
+        return index
+
+    index = DateBlockIndex(filepath)
+    if st is None or not (index.load() and index.matches(st)):
+        index.rebuild()
+    _INDEXES[filepath] = index
+    return index
+
+
+def drop_index(filepath: str):
+    """Forget the cached index (e.g. after the file was replaced wholesale)"""
+    _INDEXES.pop(filepath, None)
@@ -1,11 +1,30 @@
 import os
 import re
+import tempfile
+import threading
+import zlib
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
+
+from notes_cache import DocumentCache, ParsedDocument
+from notes_index import DateBlockIndex, drop_index, get_index, scan_headers, split_blocks
+from notes_search import QUERY_STOPWORDS, NotesSearchIndex, make_snippet, tokenize
+from notes_sqlite import SqliteNotesStore
+from notes_vectors import VectorIndex, embed, embed_query
 
 # === CONFIG ===
 NOTES_DIR = "./notes" # folder where all context files live
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+FSYNC_WRITES = True  # fsync each context file once per group-committed batch
+JOURNAL_SUFFIX = ".journal"       # redo journal next to each context file: todolist.txt.journal
+JOURNAL_MAX_BYTES = 1 << 20       # larger rewrites go through a temp file + rename instead
+JOURNAL_MAGIC = b"NJ1"
+STORAGE_BACKEND = "text"  # "text": one <context>.txt per context; "sqlite": all entries in SQLITE_PATH
+SQLITE_PATH = os.path.join(NOTES_DIR, "notes.db")
+SEARCH_RESULT_LIMIT = 5
+SEMANTIC_SEARCH = True  # Keep an on-disk embedding index and blend its hits into search results
+VECTOR_INDEX_PATH = os.path.join(NOTES_DIR, "vectors")
+NOTES_CACHE_MAX_BYTES = 64 * 1024 * 1024  # context file contents kept in memory (LRU)
 
 # --- RESULT STRUCTURE ---
 # All main action functions will return a dictionary like this:
@@ -24,12 +43,14 @@ def ensure_notes_dir():
     if not os.path.exists(NOTES_DIR):
         os.makedirs(NOTES_DIR)
 
+def safe_context_name(context: str) -> str:
+    """Return a filesystem/key-safe name derived from the context."""
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", context.lower())
+
 def get_file_path(context: str) -> str:
     """Return file path for the given context (like 'todolist')."""
     ensure_notes_dir()
-    # Use a safe name derived from the context
-    safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", context.lower())
-    return os.path.join(NOTES_DIR, f"{safe_name}.txt")
+    return os.path.join(NOTES_DIR, f"{safe_context_name(context)}.txt")
 
 # --- LOW-LEVEL FILE I/O (Kept simple, can be extended for error handling) ---
 
@@ -45,21 +66,247 @@ def read_file(filepath: str) -> str:
         return ""
 
 def write_file(filepath: str, content: str):
-    """Write text to file (overwrite)."""
+    """Write text to file (overwrite) atomically: readers and crashes see the old or new file."""
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(content)
+        replace_tail_atomically(filepath, 0, content.encode("utf-8"))
+        DOC_CACHE.invalidate(filepath)
     except IOError as e:
         print(f"Error writing file {filepath}: {e}")
 
+def fsync_dir(directory: str):
+    """Persist a rename in directory."""
+    fd = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def replace_tail_atomically(filepath: str, start: int, new_tail: bytes):
+    """Write file[:start] + new_tail to a temp file, fsync it and rename it over filepath."""
+    directory = os.path.dirname(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if start:
+                with open(filepath, "rb") as src:
+                    remaining = start
+                    while remaining:
+                        chunk = src.read(min(remaining, 1 << 20))
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        remaining -= len(chunk)
+            out.write(new_tail)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(directory)
+
+# --- WRITE-AHEAD JOURNAL ---
+# An in-place rewrite of a file's tail is first appended to <file>.journal as
+# "NJ1 <start> <length> <crc32>\n" + new tail and fsynced. Re-applying a
+# record is idempotent (write tail at start, truncate), so startup recovery
+# replays every intact record in order and drops a torn last one. The journal
+# is cleared once the batch that wrote it has been fsynced. Pure appends skip
+# the journal: they are one sequential write and can only tear their own bytes.
+
+def journal_record(filepath: str, start: int, new_tail: bytes):
+    header = JOURNAL_MAGIC + b" %d %d %08x\n" % (start, len(new_tail), zlib.crc32(new_tail))
+    with open(filepath + JOURNAL_SUFFIX, "ab") as journal:
+        journal.write(header + new_tail)
+        journal.flush()
+        os.fsync(journal.fileno())
+
+def read_journal(journal_path: str) -> List[Tuple[int, bytes]]:
+    """Return the intact (start, new_tail) records of a journal, stopping at the first torn one."""
+    with open(journal_path, "rb") as f:
+        data = f.read()
+    records = []
+    pos = 0
+    while pos < len(data):
+        newline = data.find(b"\n", pos)
+        parts = data[pos:newline].split() if newline != -1 else []
+        if len(parts) != 4 or parts[0] != JOURNAL_MAGIC:
+            break
+        try:
+            start, length, crc = int(parts[1]), int(parts[2]), int(parts[3], 16)
+        except ValueError:
+            break
+        body = data[newline + 1:newline + 1 + length]
+        if len(body) != length or zlib.crc32(body) != crc:
+            break
+        records.append((start, body))
+        pos = newline + 1 + length
+    return records
+
+def clear_journal(filepath: str):
+    """Forget the journal once everything it describes is durable in the file."""
+    journal_path = filepath + JOURNAL_SUFFIX
+    if os.path.exists(journal_path) and os.path.getsize(journal_path):
+        with open(journal_path, "r+b") as journal:
+            journal.truncate()
+            os.fsync(journal.fileno())
+
+def commit_writes(filepath: str):
+    """Make a batch of writes to filepath durable, then clear its journal."""
+    if FSYNC_WRITES and os.path.exists(filepath):
+        with open(filepath, "rb") as f:
+            os.fsync(f.fileno())
+        with _WRITERS_LOCK:
+            WRITE_STATS["fsyncs"] += 1
+    clear_journal(filepath)
+
+def recover_journal(filepath: str) -> int:
+    """Replay filepath's journal; returns the number of records applied."""
+    journal_path = filepath + JOURNAL_SUFFIX
+    if not os.path.exists(journal_path):
+        return 0
+    records = read_journal(journal_path)
+    if records:
+        open(filepath, "ab").close()
+        with open(filepath, "r+b") as f:
+            for start, new_tail in records:
+                f.seek(start)
+                f.write(new_tail)
+                f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        drop_index(filepath)
+        DOC_CACHE.invalidate(filepath)
+    clear_journal(filepath)
+    return len(records)
+
+def recover_journals() -> Dict[str, int]:
+    """Replay every context's journal (call at startup); returns file -> records applied."""
+    ensure_notes_dir()
+    recovered = {}
+    for name in sorted(os.listdir(NOTES_DIR)):
+        if name.endswith(".txt" + JOURNAL_SUFFIX):
+            filepath = os.path.join(NOTES_DIR, name[:-len(JOURNAL_SUFFIX)])
+            count = recover_journal(filepath)
+            if count:
+                recovered[filepath] = count
+        elif name.startswith(".") and name.endswith(".tmp"):
+            # Leftover from a crash before an atomic rename; the original is intact
+            os.remove(os.path.join(NOTES_DIR, name))
+    return recovered
+
+# --- INDEXED BLOCK I/O ---
+# Dated edits find their blocks through notes_index and only read/rewrite the
+# file from the first affected block onward, so adding a new date or editing
+# the latest one never touches the rest of the file. Each command opens the
+# blocks it needs once through DOC_CACHE (a miss reads just those blocks) and
+# every write is applied to the cached blocks as well, so a command on a
+# recently used context costs a stat plus its write.
+
+DOC_CACHE = DocumentCache(NOTES_CACHE_MAX_BYTES)
+
+def load_index(filepath: str) -> DateBlockIndex:
+    """Return an up-to-date block index for filepath, creating the file if needed."""
+    if not os.path.exists(filepath):
+        open(filepath, "ab").close()
+    return get_index(filepath)
+
+def open_document(filepath: str, index: DateBlockIndex, start: int) -> ParsedDocument:
+    """Return the file's parsed blocks from (at least) the one containing start to EOF."""
+    return DOC_CACHE.open(filepath, index, start)
+
+def trailing_whitespace_start(filepath: str, index: DateBlockIndex, doc: ParsedDocument, end: int) -> int:
+    """Return the offset where the run of whitespace ending at end begins."""
+    pos = doc.whitespace_start(end)
+    while pos == doc.base and pos > 0:
+        # The run reaches the first block held; open the one before it too
+        doc = open_document(filepath, index, pos - 1)
+        pos = doc.whitespace_start(pos)
+    return pos
+
+def rewrite_from(filepath: str, index: DateBlockIndex, doc: ParsedDocument, start: int,
+                 new_tail: bytes, kept_from: Optional[int] = None, delta: int = 0):
+    """
+    Replace everything from byte start to EOF with new_tail and update the
+    index and doc (the file's blocks from at most start, opened for this write).
+    If the old bytes from kept_from onward reappear in new_tail moved by delta,
+    only the part before them is rescanned for headers.
+    """
+    old_length = index.size - start
+    if old_length <= len(new_tail) and new_tail.startswith(doc.tail(start)):
+        # Only adds bytes (a new date block, an append): one sequential write
+        with open(filepath, "ab") as f:
+            f.write(new_tail[old_length:])
+    elif len(new_tail) > JOURNAL_MAX_BYTES:
+        replace_tail_atomically(filepath, start, new_tail)
+    else:
+        journal_record(filepath, start, new_tail)
+        with open(filepath, "r+b") as f:
+            f.seek(start)
+            f.write(new_tail)
+            f.truncate()
+    if kept_from is None:
+        index.replace_from(start, scan_headers(new_tail, start))
+    else:
+        changed = new_tail[:kept_from + delta - start]
+        index.splice(start, kept_from, scan_headers(changed, start), delta)
+    DOC_CACHE.write_through(filepath, doc, start, new_tail, index.offsets)
+
+def locate_blocks(filepath: str, date: str, lead: int = 0):
+    """
+    Return (index, doc, blocks, start, tail) for the blocks dated date, where
+    doc holds the file's blocks from start (lead bytes before the first block)
+    and tail is the file from start to EOF. The index is rebuilt once if its
+    offsets don't land on a header.
+    """
+    for _ in range(2):
+        index = load_index(filepath)
+        blocks = index.find(date)
+        start = max(index.offsets[blocks[0]] - lead, 0) if blocks else index.size
+        doc = open_document(filepath, index, start)
+        if not blocks:
+            return index, doc, blocks, start, b""
+        tail = doc.tail(start)
+        if all(tail.startswith(b"##", index.offsets[k] - start) for k in blocks):
+            return index, doc, blocks, start, tail
+        drop_index(filepath)
+        DOC_CACHE.invalidate(filepath)
+        if os.path.exists(index.index_path):
+            os.remove(index.index_path)
+    raise IOError(f"Could not index date blocks in {filepath}")
+
+def first_byte(filepath: str, doc: ParsedDocument) -> bytes:
+    """Return the file's first byte, from doc if it holds the start of the file."""
+    if doc.base == 0:
+        return doc.tail(0)[:1]
+    with open(filepath, "rb") as f:
+        return f.read(1)
+
+def cut_spans(tail: bytes, base: int, spans: List[Tuple[int, int]], replacement: bytes) -> bytes:
+    """Replace each absolute [start, end) span inside tail (which begins at base)."""
+    pieces = []
+    cursor = 0
+    for start, end in spans:
+        pieces.append(tail[cursor:start - base])
+        pieces.append(replacement)
+        cursor = end - base
+    pieces.append(tail[cursor:])
+    return b"".join(pieces)
+
 # --- INTENT-DRIVEN HELPER FUNCTIONS ---
 
 def append_to_file_intent(filepath: str, new_text: str, context: str) -> Dict[str, Any]:
     """Append text to file and return status."""
+    return append_many_to_file_intent(filepath, [new_text], context)
+
+def append_many_to_file_intent(filepath: str, texts: List[str], context: str) -> Dict[str, Any]:
+    """Append several texts with one write (same bytes as appending each in turn)."""
     intent = "append"
     try:
-        with open(filepath, "a", encoding="utf-8") as f:
-            f.write("\n" + new_text.strip() + "\n")
+        index = load_index(filepath)
+        doc = open_document(filepath, index, index.size)
+        payload = "".join("\n" + text.strip() + "\n" for text in texts)
+        rewrite_from(filepath, index, doc, index.size, payload.encode("utf-8"))
         return {
             "success": True,
             "message": f"Successfully appended content to {context}",
@@ -89,24 +336,28 @@ def insert_or_update_date_entry(filepath: str, date: str, text: str, context: st
     """
     intent = "insert_or_update"
     try:
-        content = read_file(filepath)
-        # Pattern to find a date block (starts with ## YYYY-MM-DD and ends before the next ## or EOF)
-        pattern = rf"(##\s*{re.escape(date)}\s*\n)(.*?)(?=\n##\s*\d{{4}}-\d{{2}}-\d{{2}}|\Z)"
-        match = re.search(pattern, content, flags=re.DOTALL)
+        index, doc, blocks, start, tail = locate_blocks(filepath, date)
+        new_entry_content = f"## {date}\n{text.strip()}\n".encode("utf-8")
 
-        new_entry_content = f"## {date}\n{text.strip()}\n"
-
-        if match:
-            # Replace existing date block
-            updated = re.sub(pattern, new_entry_content, content, flags=re.DOTALL)
-            write_file(filepath, updated)
+        if blocks:
+            # Replace existing date block(s); only the file from the first one onward is rewritten
+            spans = [index.span(k) for k in blocks]
+            delta = sum(len(new_entry_content) - (e - s) for s, e in spans)
+            rewrite_from(filepath, index, doc, start, cut_spans(tail, start, spans, new_entry_content),
+                         kept_from=spans[-1][1], delta=delta)
             action = "update"
             message = f"Successfully **updated** entry for {date} in context '{context}'."
         else:
-            # Append new date section
-            # Ensure content starts with a newline if not empty
-            content_to_write = content.strip() + "\n" + new_entry_content
-            write_file(filepath, content_to_write)
+            # Append new date section after trimming trailing whitespace
+            start = trailing_whitespace_start(filepath, index, doc, index.size)
+            if start and first_byte(filepath, doc).isspace():
+                # Leading whitespace is stripped too, which needs one full rewrite
+                doc = open_document(filepath, index, 0)
+                new_tail = doc.tail(0)[:start].lstrip() + b"\n" + new_entry_content
+                start = 0
+            else:
+                new_tail = b"\n" + new_entry_content
+            rewrite_from(filepath, index, doc, start, new_tail)
             action = "insert"
             message = f"Successfully **inserted** new entry for {date} in context '{context}'."
 
@@ -135,13 +386,22 @@ def delete_date_entry(filepath: str, date: str, context: str) -> Dict[str, Any]:
     intent = "delete_entry"
     action = "delete"
     try:
-        content = read_file(filepath)
-        # Pattern to find and remove the date block (starts with ## YYYY-MM-DD and ends before the next ## or EOF)
-        pattern = rf"\n?(##\s*{re.escape(date)}\s*\n.*?)(?=\n##\s*\d{{4}}-\d{{2}}-\d{{2}}|\Z)"
-        new_content = re.sub(pattern, "", content, flags=re.DOTALL).strip()
+        # Each block is removed together with the newline in front of it
+        index, doc, blocks, start, tail = locate_blocks(filepath, date, lead=1)
 
-        if len(new_content) < len(content): # Check if any change occurred
-            write_file(filepath, new_content + "\n")
+        if blocks:
+            spans = [(max(s - 1, 0), e) for s, e in map(index.span, blocks)]
+            new_tail = cut_spans(tail, start, spans, b"").rstrip()
+            kept_from = spans[-1][1]
+            if start == 0:
+                new_tail = new_tail.lstrip()
+                kept_from = None
+            elif not new_tail:
+                # Nothing follows the cut; trim the whitespace in front of it too
+                start = trailing_whitespace_start(filepath, index, doc, start)
+                kept_from = None
+            rewrite_from(filepath, index, doc, start, new_tail + b"\n",
+                         kept_from=kept_from, delta=-sum(e - s for s, e in spans))
             message = f"Successfully **deleted** entry for {date} in context '{context}'."
             success = True
         else:
@@ -169,27 +429,438 @@ def delete_date_entry(filepath: str, date: str, context: str) -> Dict[str, Any]:
         }
 
 
+# --- SQLITE BACKEND ---
+# Selected with STORAGE_BACKEND = "sqlite". Same instructions and result
+# dictionaries as the text files; "filepath" is the database path.
+# `python notes_sqlite.py export <dir>` renders the "## date" text files.
+
+_SQLITE_STORE: Optional[SqliteNotesStore] = None
+_SQLITE_LOCK = threading.Lock()
+
+def get_sqlite_store() -> SqliteNotesStore:
+    """Return the shared SQLite store, opening it on first use."""
+    global _SQLITE_STORE
+    with _SQLITE_LOCK:
+        if _SQLITE_STORE is None:
+            ensure_notes_dir()
+            _SQLITE_STORE = SqliteNotesStore(SQLITE_PATH)
+        return _SQLITE_STORE
+
+def process_instruction_sqlite(context: str, action: str, text: str, date: str) -> Dict[str, Any]:
+    """Apply one instruction to the SQLite store and return a result dictionary."""
+    key = safe_context_name(context)
+    if action == "append":
+        intent, date = "append", None
+    elif action in ("insert", "update"):
+        intent = "insert_or_update"
+    else:
+        intent = "delete_entry"
+
+    try:
+        store = get_sqlite_store()
+        success = True
+        if action == "append":
+            store.append(key, text.strip())
+            message = f"Successfully appended content to {context}"
+        elif action in ("insert", "update"):
+            action = store.insert_or_update(key, date, text.strip())
+            if action == "update":
+                message = f"Successfully **updated** entry for {date} in context '{context}'."
+            else:
+                message = f"Successfully **inserted** new entry for {date} in context '{context}'."
+        elif store.delete(key, date):
+            message = f"Successfully **deleted** entry for {date} in context '{context}'."
+        else:
+            message = f"No entry found for {date} in context '{context}'. Nothing was deleted."
+            success = False
+    except Exception as e:
+        success = False
+        message = f"Failed to perform {action} on '{context}' for date {date}: {e}"
+
+    return {
+        "success": success,
+        "message": message,
+        "intent": intent,
+        "context": context,
+        "action": action,
+        "filepath": SQLITE_PATH,
+        "date": date,
+    }
+
+
+# --- SEARCH ---
+# The keyword index is read from the active backend on the first search and
+# each search re-reads any context whose storage stamp changed since; the
+# vector index is persisted and opened before the first write, and rebuilt
+# when its per-context stamps no longer match storage. Both are kept current
+# by process_instruction after every successful write.
+
+_SEARCH_INDEX: Optional[NotesSearchIndex] = None
+_VECTOR_INDEX: Optional[VectorIndex] = None
+_SEARCH_LOCK = threading.Lock()
+
+def context_entries(context: str) -> List[Tuple[Optional[str], str]]:
+    """(date, text) for every stored entry of one context, in file order."""
+    if STORAGE_BACKEND == "sqlite":
+        return get_sqlite_store().entries(context)
+    filepath = get_file_path(context)
+    if not os.path.exists(filepath):
+        return []
+    return split_blocks(DOC_CACHE.load(filepath, get_index(filepath)))
+
+def iter_entries():
+    """Yield (context, date, text) for every stored entry, in file order per context."""
+    if STORAGE_BACKEND == "sqlite":
+        contexts = get_sqlite_store().contexts()
+    else:
+        ensure_notes_dir()
+        contexts = [name[:-4] for name in sorted(os.listdir(NOTES_DIR)) if name.endswith(".txt")]
+    for context in contexts:
+        for date, text in context_entries(context):
+            yield context, date, text
+
+def get_search_index() -> NotesSearchIndex:
+    """
+    Return the search index after re-reading every context whose storage
+    stamp no longer matches the one its entries were read at: all of them
+    on first use, then any edited outside the app.
+    """
+    global _SEARCH_INDEX
+    with _SEARCH_LOCK:
+        if _SEARCH_INDEX is None:
+            _SEARCH_INDEX = NotesSearchIndex()
+        index = _SEARCH_INDEX
+    stamps = storage_stamps()
+    for context in sorted(set(stamps) | set(index.stamps)):
+        if index.stamps.get(context) != stamps.get(context):
+            with _SEARCH_LOCK:
+                sync_search_context(index, context)
+    return index
+
+def sync_search_context(index: NotesSearchIndex, context: str):
+    """Re-read one context into the keyword index (caller holds _SEARCH_LOCK)."""
+    while True:
+        # Stamped on both sides of the read so the stamp matches the entries read
+        before = storage_stamps(context).get(context)
+        entries = context_entries(context)
+        if storage_stamps(context).get(context) == before:
+            break
+    index.sync_context(context, entries, before)
+
+def storage_stamps(context: Optional[str] = None) -> Dict[str, str]:
+    """
+    context -> stamp of its stored entries (file size/mtime, like the .idx
+    sidecar, or the SQLite row fingerprint); one context, or all of them.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        return get_sqlite_store().stamps(context)
+    ensure_notes_dir()
+    names = [f"{safe_context_name(context)}.txt"] if context else sorted(os.listdir(NOTES_DIR))
+    stamps = {}
+    for name in names:
+        path = os.path.join(NOTES_DIR, name)
+        if name.endswith(".txt") and os.path.exists(path):
+            st = os.stat(path)
+            if st.st_size:
+                stamps[name[:-4]] = f"{st.st_size}:{st.st_mtime_ns}"
+    return stamps
+
+def get_vector_index() -> VectorIndex:
+    """
+    Open the on-disk vector index, re-embedding every stored entry if it is
+    new or its stamps no longer match storage (edited outside the app, or a
+    crash between a note write and its index update).
+    """
+    global _VECTOR_INDEX
+    with _SEARCH_LOCK:
+        if _VECTOR_INDEX is None:
+            ensure_notes_dir()
+            index = VectorIndex(VECTOR_INDEX_PATH)
+            # Stamped before reading, so a write landing mid-rebuild shows up as stale
+            stamps = storage_stamps()
+            if not index.is_current(stamps):
+                index.reset()
+                for context, date, text in iter_entries():
+                    if date is None:
+                        index.add(context, embed(text))
+                    else:
+                        index.set((context, date), embed(text))
+                for context, token in stamps.items():
+                    index.stamp(context, token)
+            _VECTOR_INDEX = index
+        return _VECTOR_INDEX
+
+def update_search_index(result: Dict[str, Any], text: str):
+    """
+    Mirror a successful write into the search indexes that are open.
+    The write is already in storage, so an index failure only drops the
+    indexes; they are rebuilt from storage on next use.
+    """
+    global _SEARCH_INDEX, _VECTOR_INDEX
+    if not result["success"]:
+        return
+    try:
+        apply_to_search_indexes(result, text)
+    except Exception as e:
+        print(f"Search index update failed, rebuilding on next use: {e}")
+        with _SEARCH_LOCK:
+            _SEARCH_INDEX = None
+            _VECTOR_INDEX = None
+
+def apply_to_search_indexes(result: Dict[str, Any], text: str):
+    """Apply one successful write to the keyword and vector indexes."""
+    context = safe_context_name(result["context"])
+    action, date, text = result["action"], result["date"], text.strip()
+    stamp = storage_stamps(context).get(context)
+
+    keywords = _SEARCH_INDEX
+    if keywords is not None:
+        with _SEARCH_LOCK:
+            # A context never read yet is picked up by the next get_search_index;
+            # a re-read at the current stamp already included this write
+            if context in keywords.stamps and keywords.read_stamps.get(context) != stamp:
+                if action == "append":
+                    keywords.append(context, text)
+                elif action in ("insert", "update"):
+                    keywords.set_entry(context, date, text)
+                elif action == "delete":
+                    keywords.remove_entry(context, date)
+                if stamp is None:
+                    keywords.stamps.pop(context, None)
+                else:
+                    keywords.stamps[context] = stamp
+
+    vectors = _VECTOR_INDEX
+    if vectors is not None:
+        if action == "append":
+            vectors.add(context, embed(text))
+        elif action in ("insert", "update"):
+            vectors.set((context, date), embed(text))
+        elif action == "delete":
+            vectors.remove((context, date))
+        vectors.stamp(context, stamp or "")
+
+def search_notes(query: str, context: Optional[str] = None, limit: int = SEARCH_RESULT_LIMIT) -> Dict[str, Any]:
+    """
+    Search all contexts (or one) and return ranked entries with snippets.
+    Keyword hits come first; semantic hits fill the remaining slots.
+    """
+    key = safe_context_name(context) if context else None
+    try:
+        keywords = get_search_index()
+        results = [dict(hit.__dict__, match="keyword") for hit in keywords.search(query, context=key, limit=limit)]
+
+        if SEMANTIC_SEARCH and len(results) < limit:
+            seen = {(r["context"], r["date"]) for r in results}
+            terms = [t for t in tokenize(query) if t not in QUERY_STOPWORDS]
+            for (ctx, date), score in get_vector_index().search(embed_query(query), context=key, limit=limit):
+                text = keywords.texts.get((ctx, date))
+                if (ctx, date) in seen or text is None:
+                    continue
+                results.append({"context": ctx, "date": date, "score": round(score, 3),
+                                "snippet": make_snippet(text, terms), "match": "semantic"})
+                if len(results) == limit:
+                    break
+
+        return {
+            "success": True,
+            "message": f"Found {len(results)} matching entr{'y' if len(results) == 1 else 'ies'} for '{query}'.",
+            "intent": "search",
+            "context": context,
+            "action": "search",
+            "filepath": None,
+            "date": None,
+            "results": results,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Failed to search notes for '{query}': {e}",
+            "intent": "search",
+            "context": context,
+            "action": "search",
+            "filepath": None,
+            "date": None,
+            "results": [],
+        }
+
+
+# --- WRITE QUEUE / GROUP COMMIT ---
+# Writes to a context are serialized through a per-context queue. The first
+# caller to find the queue idle becomes the leader and applies everything
+# that queued up behind it as one batch: consecutive appends are merged into
+# one write and the file is fsynced once per batch. Other callers just wait
+# for their result.
+
+WRITE_STATS = {"writes": 0, "batches": 0, "fsyncs": 0}
+
+class PendingWrite:
+    """One queued instruction and, once applied, its result."""
+
+    def __init__(self, action: str, text: str, date: str):
+        self.action = action
+        self.text = text
+        self.date = date
+        self.result: Optional[Dict[str, Any]] = None
+        self.done = threading.Event()
+
+class ContextWriter:
+    """Queue of pending writes for one context."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: List[PendingWrite] = []
+        self.leader_active = False
+
+_WRITERS: Dict[str, ContextWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+def get_writer(context: str) -> ContextWriter:
+    key = safe_context_name(context)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = ContextWriter()
+        return writer
+
+def write_failure(context: str, op: PendingWrite, reason: str) -> Dict[str, Any]:
+    """Result for a queued write that could not be completed."""
+    return {
+        "success": False,
+        "message": f"Failed to perform {op.action} on '{context}': {reason}",
+        "intent": op.action,
+        "context": context,
+        "action": op.action,
+        "filepath": None,
+        "date": op.date,
+    }
+
+def submit_write(context: str, op: PendingWrite) -> Dict[str, Any]:
+    """Queue a write for context; lead the batch if nobody else is, else wait for it."""
+    writer = get_writer(context)
+    with writer.lock:
+        writer.pending.append(op)
+        lead = not writer.leader_active
+        writer.leader_active = True
+
+    if not lead:
+        op.done.wait()
+        return op.result
+
+    batch: List[PendingWrite] = []
+    try:
+        while True:
+            with writer.lock:
+                batch, writer.pending = writer.pending, []
+                if not batch:
+                    writer.leader_active = False
+                    break
+            try:
+                apply_batch(context, batch)
+            except Exception as e:
+                for queued in batch:
+                    if queued.result is None:
+                        queued.result = write_failure(context, queued, str(e))
+            for queued in batch:
+                queued.done.set()
+    except BaseException:
+        # The leader itself was interrupted: answer everyone still waiting
+        # and give up leadership (a normal exit already did so under the lock)
+        with writer.lock:
+            stranded, writer.pending = batch + writer.pending, []
+            writer.leader_active = False
+        for queued in stranded:
+            if not queued.done.is_set():
+                if queued.result is None:
+                    queued.result = write_failure(context, queued, "write batch aborted")
+                queued.done.set()
+        raise
+    return op.result
+
+def apply_batch(context: str, batch: List[PendingWrite]):
+    """Apply queued writes in order, merging runs of appends, then fsync once."""
+    with _WRITERS_LOCK:
+        WRITE_STATS["batches"] += 1
+        WRITE_STATS["writes"] += len(batch)
+    text_backend = STORAGE_BACKEND != "sqlite"
+    filepath = get_file_path(context) if text_backend else SQLITE_PATH
+
+    i = 0
+    while i < len(batch):
+        op = batch[i]
+        if text_backend and op.action == "append":
+            j = i
+            while j < len(batch) and batch[j].action == "append":
+                j += 1
+            group = batch[i:j]
+            try:
+                result = append_many_to_file_intent(filepath, [queued.text for queued in group], context)
+            except Exception as e:
+                result = write_failure(context, op, str(e))
+            for queued in group:
+                queued.result = dict(result)
+                update_search_index(result, queued.text)
+            i = j
+        else:
+            try:
+                op.result = apply_instruction(context, op.action, op.text, op.date)
+            except Exception as e:
+                op.result = write_failure(context, op, str(e))
+            i += 1
+
+    # SQLite (WAL, synchronous=NORMAL) handles its own durability
+    if text_backend:
+        try:
+            commit_writes(filepath)
+        except OSError as e:
+            for queued in batch:
+                if queued.result["success"]:
+                    queued.result = write_failure(context, queued, f"could not make the write durable: {e}")
+
+
 # --- MAIN DISPATCHER FUNCTION ---
 
 def process_instruction(context: str, action: str, text: str = "", date: str = None) -> Dict[str, Any]:
     """
     Process a single instruction and return a result dictionary.
+    Writes go through the context's queue (see submit_write).
     """
-    filepath = get_file_path(context)
     # Default date for dated actions (insert/update/delete)
     if not date:
         date = datetime.now().strftime(DATE_FORMAT)
 
+    if SEMANTIC_SEARCH:
+        # Open (or build) the vector index before the write so the write is applied to it once
+        get_vector_index()
+
+    if action in ("append", "insert", "update", "delete"):
+        return submit_write(context, PendingWrite(action, text, date))
+    return apply_instruction(context, action, text, date)
+
+def apply_instruction(context: str, action: str, text: str, date: str) -> Dict[str, Any]:
+    """Apply one instruction to storage directly (callers hold the context's queue)."""
+    if STORAGE_BACKEND == "sqlite" and action in ("append", "insert", "update", "delete"):
+        result = process_instruction_sqlite(context, action, text, date)
+        update_search_index(result, text)
+        return result
+
+    filepath = get_file_path(context)
     if action == "append":
-        return append_to_file_intent(filepath, text, context)
+        result = append_to_file_intent(filepath, text, context)
+        update_search_index(result, text)
+        return result
 
     elif action in ("insert", "update"):
         # The underlying function handles both insert and update logic
-        return insert_or_update_date_entry(filepath, date, text, context)
+        result = insert_or_update_date_entry(filepath, date, text, context)
+        update_search_index(result, text)
+        return result
 
     elif action == "delete":
         # The underlying function handles the deletion logic
-        return delete_date_entry(filepath, date, context)
+        result = delete_date_entry(filepath, date, context)
+        update_search_index(result, text)
+        return result
 
     else:
         # Unknown action handler
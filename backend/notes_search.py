@@ -0,0 +1,210 @@
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# === CONFIG ===
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 160
+# Spoken queries carry filler ("my notes about ..."); these never score
+QUERY_STOPWORDS = {
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "about", "my", "me",
+    "notes", "note", "anything", "something", "with", "what", "did", "i", "say", "is",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+# An entry is addressed by (context, date); date is None for undated text
+EntryKey = Tuple[str, Optional[str]]
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class EntryOrder:
+    """Entry order per context, so appended text joins the last entry like it does on disk"""
+
+    def __init__(self):
+        self.by_context: Dict[str, Dict[Optional[str], None]] = {}
+
+    def add(self, key: EntryKey):
+        """Place a new entry at the end of its context (an existing one keeps its place)"""
+        self.by_context.setdefault(key[0], {}).setdefault(key[1], None)
+
+    def discard(self, key: EntryKey):
+        entries = self.by_context.get(key[0])
+        if entries is not None:
+            entries.pop(key[1], None)
+
+    def last(self, context: str) -> EntryKey:
+        """The entry undated text appended to context belongs to"""
+        entries = self.by_context.get(context)
+        return (context, next(reversed(entries)) if entries else None)
+
+    def count(self, context: str) -> int:
+        return len(self.by_context.get(context, ()))
+
+    def contexts(self) -> List[str]:
+        return list(self.by_context)
+
+
+@dataclass
+class SearchHit:
+    """One ranked search result"""
+    context: str
+    date: Optional[str]
+    score: float
+    snippet: str
+
+
+class NotesSearchIndex:
+    """
+    In-memory inverted index over note entries across all contexts.
+
+    Every entry (a dated block, or the undated text before the first one) is
+    a document; postings map each token to the documents and word positions
+    it occurs at. Writes replace one entry's postings, so the index follows
+    notes_manager without rescanning files. Queries rank by BM25; "quoted
+    phrases" must appear verbatim. Per context, stamps is the storage stamp
+    the entries reflect and read_stamps the one they were last re-read from
+    storage at (sync_context), so callers can tell which contexts to re-read
+    and which writes a re-read already included.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings: Dict[str, Dict[EntryKey, List[int]]] = {}
+        self.texts: Dict[EntryKey, str] = {}
+        self.lengths: Dict[EntryKey, int] = {}
+        self.total_length = 0
+        self.order = EntryOrder()
+        self.stamps: Dict[str, str] = {}
+        self.read_stamps: Dict[str, str] = {}
+
+    # --- Updates ---
+
+    def set_entry(self, context: str, date: Optional[str], text: str):
+        """Add an entry, or replace one in place (keeping its position, as on disk)"""
+        with self._lock:
+            self._remove((context, date), keep_place=True)
+            self._add((context, date), text)
+
+    def append(self, context: str, text: str):
+        """Append undated text to the context's last entry"""
+        with self._lock:
+            key = self.order.last(context)
+            previous = self.texts.get(key)
+            self._remove(key, keep_place=True)
+            self._add(key, previous + "\n" + text if previous else text)
+
+    def remove_entry(self, context: str, date: Optional[str]):
+        with self._lock:
+            self._remove((context, date))
+
+    def sync_context(self, context: str, entries: Iterable[Tuple[Optional[str], str]], stamp: Optional[str]):
+        """Replace every entry of context with (date, text) entries read from storage at stamp"""
+        with self._lock:
+            for date in list(self.order.by_context.get(context, ())):
+                self._remove((context, date))
+            for date, text in entries:
+                key = (context, date) if date is not None else self.order.last(context)
+                previous = self.texts.get(key) if date is None else None
+                self._remove(key, keep_place=True)
+                # Undated rows/snippets belong to the entry before them, as on disk
+                self._add(key, previous + "\n" + text if previous else text)
+            if stamp is None:
+                self.stamps.pop(context, None)
+                self.read_stamps.pop(context, None)
+            else:
+                self.stamps[context] = self.read_stamps[context] = stamp
+
+    def _add(self, key: EntryKey, text: str):
+        tokens = tokenize(text)
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(key, []).append(position)
+        self.texts[key] = text
+        self.lengths[key] = len(tokens)
+        self.total_length += len(tokens)
+        self.order.add(key)
+
+    def _remove(self, key: EntryKey, keep_place: bool = False):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for token in set(tokenize(text)):
+            docs = self.postings[token]
+            del docs[key]
+            if not docs:
+                del self.postings[token]
+        self.total_length -= self.lengths.pop(key)
+        if not keep_place:
+            self.order.discard(key)
+
+    # --- Queries ---
+
+    def search(self, query: str, context: Optional[str] = None, limit: int = 5) -> List[SearchHit]:
+        """Rank entries for a keyword/phrase query, optionally within one context"""
+        phrases = [tokenize(p) for p in PHRASE_PATTERN.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = [t for t in tokenize(PHRASE_PATTERN.sub(" ", query)) if t not in QUERY_STOPWORDS]
+        terms += [t for p in phrases for t in p]
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self.texts)
+            avg_length = self.total_length / n_docs if n_docs else 0.0
+            scores: Dict[EntryKey, float] = {}
+            for term in set(terms):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for key, positions in docs.items():
+                    if context is not None and key[0] != context:
+                        continue
+                    tf = len(positions)
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[key] / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            hits = []
+            for key, score in ranked:
+                if not all(self._has_phrase(key, phrase) for phrase in phrases):
+                    continue
+                hits.append(SearchHit(key[0], key[1], round(score, 3), make_snippet(self.texts[key], terms)))
+                if len(hits) == limit:
+                    break
+            return hits
+
+    def _has_phrase(self, key: EntryKey, phrase: List[str]) -> bool:
+        lists = [self.postings.get(token, {}).get(key) for token in phrase]
+        if not all(lists):
+            return False
+        following = [set(positions) for positions in lists[1:]]
+        return any(all(start + i + 1 in positions for i, positions in enumerate(following))
+                   for start in lists[0])
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+
+def make_snippet(text: str, terms: Iterable[str]) -> str:
+    """Cut a window of text around the first query term, on word boundaries"""
+    wanted = set(terms)
+    first = next((m for m in TOKEN_PATTERN.finditer(text.lower()) if m.group() in wanted), None)
+    center = first.start() if first else 0
+    start = max(0, center - SNIPPET_CHARS // 3)
+    end = min(len(text), start + SNIPPET_CHARS)
+    if start > 0:
+        space = text.find(" ", start, center)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(" ", center, end)
+        end = space if space > center else end
+    snippet = " ".join(text[start:end].split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
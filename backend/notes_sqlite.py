@@ -0,0 +1,200 @@
+import argparse
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from notes_index import split_blocks
+
+# === CONFIG ===
+BUSY_TIMEOUT_MS = 5000  # how long a writer waits for another worker's write lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id      INTEGER PRIMARY KEY,   -- also the entry's position in the rendered file
+    context TEXT NOT NULL,
+    date    TEXT,                  -- NULL for undated (appended) text
+    body    TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_context_date ON entries (context, date);
+CREATE INDEX IF NOT EXISTS entries_context_id ON entries (context, id);
+
+-- Bumped on every change to a context's rows; the stamp search indexes check against
+CREATE TABLE IF NOT EXISTS context_versions (
+    context TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert_version AFTER INSERT ON entries BEGIN
+    INSERT INTO context_versions VALUES (new.context, 1)
+    ON CONFLICT (context) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update_version AFTER UPDATE ON entries BEGIN
+    INSERT INTO context_versions VALUES (new.context, 1)
+    ON CONFLICT (context) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete_version AFTER DELETE ON entries BEGIN
+    UPDATE context_versions SET version = version + 1 WHERE context = old.context;
+END;
+"""
+
+# Fixed statement texts so sqlite3's per-connection statement cache reuses them
+SQL_APPEND = "INSERT INTO entries (context, date, body) VALUES (?, NULL, ?)"
+SQL_FIND = "SELECT id FROM entries WHERE context = ? AND date = ?"
+SQL_UPDATE = "UPDATE entries SET body = ? WHERE id = ?"
+SQL_INSERT = "INSERT INTO entries (context, date, body) VALUES (?, ?, ?)"
+SQL_UPSERT = ("INSERT INTO entries (context, date, body) VALUES (?, ?, ?) "
+              "ON CONFLICT (context, date) DO UPDATE SET body = excluded.body")
+SQL_DELETE = "DELETE FROM entries WHERE id = ?"
+# Undated rows between an entry and the next dated one (text appended to it)
+SQL_DELETE_APPENDED = (
+    "DELETE FROM entries WHERE context = ?1 AND date IS NULL AND id > ?2 AND id < "
+    "COALESCE((SELECT MIN(id) FROM entries WHERE context = ?1 AND date IS NOT NULL AND id > ?2), ?2 + (1 << 62))"
+)
+SQL_ENTRIES = "SELECT date, body FROM entries WHERE context = ? ORDER BY id"
+SQL_CONTEXTS = "SELECT DISTINCT context FROM entries ORDER BY context"
+# Per-context stamp: row count plus a version bumped by triggers on every change
+SQL_STAMPS = ("SELECT e.context, COUNT(*), v.version FROM entries e "
+              "JOIN context_versions v ON v.context = e.context "
+              "WHERE ?1 IS NULL OR e.context = ?1 GROUP BY e.context")
+
+
+class SqliteNotesStore:
+    """
+    Notes storage in one SQLite database: a row per dated block or appended
+    snippet, keyed by (context, date). As in the text files, appended text
+    belongs to the entry before it and is replaced/deleted along with it.
+
+    The database runs in WAL mode so readers never block the writer, and
+    writes take the lock up front (BEGIN IMMEDIATE) so several worker
+    threads or processes can share the file. Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Writes ---
+
+    def append(self, context: str, text: str):
+        self._connect().execute(SQL_APPEND, (context, text))
+
+    def insert_or_update(self, context: str, date: str, text: str) -> str:
+        """Replace the entry for date, or add it at the end; returns 'update' or 'insert'"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(SQL_FIND, (context, date)).fetchone()
+            if row:
+                conn.execute(SQL_UPDATE, (text, row[0]))
+                conn.execute(SQL_DELETE_APPENDED, (context, row[0]))
+                action = "update"
+            else:
+                conn.execute(SQL_INSERT, (context, date, text))
+                action = "insert"
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return action
+
+    def delete(self, context: str, date: str) -> bool:
+        """Delete the entry for date; returns False if there was none"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(SQL_FIND, (context, date)).fetchone()
+            if row:
+                conn.execute(SQL_DELETE_APPENDED, (context, row[0]))
+                conn.execute(SQL_DELETE, (row[0],))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    # --- Reads / Export ---
+
+    def entries(self, context: str) -> List[Tuple[Optional[str], str]]:
+        """(date, body) rows for context in file order; date is None for appended text"""
+        return self._connect().execute(SQL_ENTRIES, (context,)).fetchall()
+
+    def contexts(self) -> List[str]:
+        return [row[0] for row in self._connect().execute(SQL_CONTEXTS)]
+
+    def stamps(self, context: Optional[str] = None) -> Dict[str, str]:
+        """context -> stamp of its rows (one context, or all of them)"""
+        return {row[0]: f"{row[1]}:{row[2]}"
+                for row in self._connect().execute(SQL_STAMPS, (context,))}
+
+    def export_context(self, context: str) -> str:
+        """Render a context in the plain-text "## date" format notes_manager writes"""
+        blocks = [body + "\n" if date is None else f"## {date}\n{body}\n"
+                  for date, body in self.entries(context)]
+        return "\n".join(blocks)
+
+    def export_all(self, out_dir: str) -> Dict[str, str]:
+        """Write every context to out_dir/<context>.txt; returns context -> path"""
+        os.makedirs(out_dir, exist_ok=True)
+        paths = {}
+        for context in self.contexts():
+            path = os.path.join(out_dir, f"{context}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.export_context(context))
+            paths[context] = path
+        return paths
+
+    def import_text_file(self, context: str, filepath: str) -> int:
+        """Load a plain-text context file into the store; returns the number of rows added"""
+        with open(filepath, "rb") as f:
+            data = f.read()
+
+        rows = [(context, date, text) for date, text in split_blocks(data)]
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(SQL_UPSERT, rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+
+# === CLI: migrate text notes in, or export the database back to text ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import/export the SQLite notes store")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("directory", help="folder of <context>.txt files to import from / export to")
+    parser.add_argument("--db", default=os.path.join("notes", "notes.db"))
+    args = parser.parse_args()
+
+    store = SqliteNotesStore(args.db)
+    if args.command == "import":
+        for name in sorted(os.listdir(args.directory)):
+            if name.endswith(".txt"):
+                count = store.import_text_file(name[:-4], os.path.join(args.directory, name))
+                print(f"{name}: {count} entries")
+    else:
+        for context, path in store.export_all(args.directory).items():
+            print(f"{context} -> {path}")
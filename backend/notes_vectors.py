@@ -0,0 +1,307 @@
+import os
+import tempfile
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from notes_search import QUERY_STOPWORDS, EntryKey, EntryOrder, tokenize
+
+# === CONFIG ===
+EMBEDDING_DIM = 256
+CHAR_NGRAM = 3              # character n-grams per word, so "relays" still lands near "relay"
+NGRAM_WEIGHT = 0.5          # relative to the whole-word feature
+INITIAL_CAPACITY = 1024     # rows; the matrix file doubles when full
+QUERY_CHUNK_ROWS = 8192     # rows converted to float32 at a time during a query
+LOG_COMPACT_FACTOR = 4      # rewrite the key log once it has this many lines per live entry/stamp
+LOG_COMPACT_MIN_LINES = 4096
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM, stopwords=()) -> np.ndarray:
+    """
+    Hashed bag of words and character n-grams (unnormalized, float32).
+
+    Features are signed-hashed into dim buckets, so the embedding of two texts
+    joined together is the sum of their embeddings: appending to an entry
+    only needs the appended text embedded.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in tokenize(text):
+        if word in stopwords:
+            continue
+        features = [(word, 1.0)]
+        padded = f"<{word}>"
+        features += [(padded[i:i + CHAR_NGRAM], NGRAM_WEIGHT) for i in range(len(padded) - CHAR_NGRAM + 1)]
+        for feature, weight in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % dim] += weight if h & 0x80000000 else -weight
+    return vector
+
+
+class VectorIndex:
+    """
+    On-disk vector index of note entries.
+
+    Embeddings live in a memory-mapped float16 matrix (<path>.f16), one row
+    per entry; row ownership is an append-only log (<path>.keys) replayed on
+    open. A write touches one matrix row and appends one log line; the row is
+    flushed before the line is logged. After each write the caller logs the
+    context's storage stamp and entry count (stamp()), and an index whose
+    stamps no longer match storage is rebuilt (is_current(), reset()). The
+    log is rewritten with just the live rows and latest stamps once it grows
+    to LOG_COMPACT_FACTOR lines per live line. Queries are a chunked matrix-vector product over the mmap plus an
+    argpartition top-k. Rows are stored unnormalized; norms are kept in memory.
+    """
+
+    def __init__(self, path: str, dim: int = EMBEDDING_DIM):
+        self.matrix_path = path + ".f16"
+        self.keys_path = path + ".keys"
+        self.dim = dim
+        self._lock = threading.Lock()
+        self.rows: Dict[EntryKey, int] = {}
+        self.keys: List[Optional[EntryKey]] = []   # row -> key (None when free)
+        self.free: List[int] = []
+        self.order = EntryOrder()
+        # context -> (storage stamp, entry count) as of the last write logged for it
+        self.stamps: Dict[str, Tuple[str, int]] = {}
+        self.log_lines = 0
+        # Per-row context id (-1 when free), so a context filter is one vector compare
+        self.context_ids: Dict[str, int] = {}
+        self.row_contexts = np.zeros(0, dtype=np.int32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.matrix: Optional[np.memmap] = None
+        self._open()
+
+    # --- Storage ---
+
+    def _open(self):
+        if os.path.exists(self.keys_path):
+            self._replay()
+        else:
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.write(f"dim\t{self.dim}\n")
+        capacity = max(INITIAL_CAPACITY, len(self.keys))
+        # Logged rows past the end of the matrix file were never written
+        size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        self.rows_missing = size < len(self.keys) * self.dim * 2
+        if not os.path.exists(self.matrix_path) or os.path.getsize(self.matrix_path) < capacity * self.dim * 2:
+            with open(self.matrix_path, "ab") as f:
+                f.truncate(capacity * self.dim * 2)
+        self._map()
+        used = len(self.keys)
+        self.norms = np.zeros(self.capacity, dtype=np.float32)
+        for start in range(0, used, QUERY_CHUNK_ROWS):
+            chunk = self.matrix[start:min(used, start + QUERY_CHUNK_ROWS)].astype(np.float32)
+            self.norms[start:start + len(chunk)] = np.linalg.norm(chunk, axis=1)
+        self.row_contexts = np.full(self.capacity, -1, dtype=np.int32)
+        for row, key in enumerate(self.keys):
+            if key is not None:
+                self.row_contexts[row] = self._context_id(key[0])
+
+    def _context_id(self, context: str) -> int:
+        return self.context_ids.setdefault(context, len(self.context_ids))
+
+    def _map(self):
+        rows = os.path.getsize(self.matrix_path) // (self.dim * 2)
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float16, mode="r+", shape=(rows, self.dim))
+
+    @property
+    def capacity(self) -> int:
+        return self.matrix.shape[0]
+
+    def _replay(self):
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\n").split("\t")
+            if header[0] == "dim":
+                self.dim = int(header[1])
+            for line in f:
+                self.log_lines += 1
+                parts = line.rstrip("\n").split("\t")
+                if parts[0] == "stamp":
+                    if len(parts) == 4:
+                        self.stamps[parts[1]] = (parts[2], int(parts[3]))
+                    continue
+                row = int(parts[1])
+                while len(self.keys) <= row:
+                    self.keys.append(None)
+                if parts[0] == "set":
+                    key = (parts[2], parts[3] or None)
+                    self.keys[row] = key
+                    self.rows[key] = row
+                    self.order.add(key)
+                else:
+                    key = self.keys[row]
+                    self.keys[row] = None
+                    if key is not None:
+                        self.rows.pop(key, None)
+                        self.order.discard(key)
+        self.free = [row for row, key in enumerate(self.keys) if key is None]
+
+    def _log(self, line: str):
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.write(line)
+        self.log_lines += 1
+        if self.log_lines > LOG_COMPACT_FACTOR * max(len(self.rows) + len(self.stamps), LOG_COMPACT_MIN_LINES):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the key log as one set line per live row (in entry order) plus the latest stamps"""
+        lines = [f"dim\t{self.dim}\n"]
+        for context in self.order.contexts():
+            for date in self.order.by_context[context]:
+                lines.append(f"set\t{self.rows[(context, date)]}\t{context}\t{date or ''}\n")
+        lines += [f"stamp\t{context}\t{token}\t{count}\n" for context, (token, count) in self.stamps.items()]
+
+        self.matrix.flush()
+        directory = os.path.dirname(os.path.abspath(self.keys_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".vectors-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.keys_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.log_lines = len(lines) - 1
+
+    def _grow(self):
+        self.matrix.flush()
+        with open(self.matrix_path, "r+b") as f:
+            f.truncate(self.capacity * 2 * self.dim * 2)
+        self._map()
+        self.norms = np.concatenate([self.norms, np.zeros(self.capacity - len(self.norms), dtype=np.float32)])
+        self.row_contexts = np.concatenate([self.row_contexts,
+                                            np.full(self.capacity - len(self.row_contexts), -1, dtype=np.int32)])
+
+    def flush(self):
+        with self._lock:
+            self.matrix.flush()
+
+    def reset(self):
+        """Drop every entry and truncate both files, ready for a rebuild"""
+        with self._lock:
+            self.matrix.flush()
+            self.matrix = None
+            self.rows, self.keys, self.free, self.stamps = {}, [], [], {}
+            self.order, self.context_ids, self.log_lines = EntryOrder(), {}, 0
+            with open(self.matrix_path, "wb"):
+                pass
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.write(f"dim\t{self.dim}\n")
+            self._open()
+
+    # --- Freshness ---
+
+    def stamp(self, context: str, token: str):
+        """Record that the index matches context's storage as identified by token"""
+        with self._lock:
+            count = self.order.count(context)
+            self.matrix.flush()
+            self._log(f"stamp\t{context}\t{token}\t{count}\n")
+            self.stamps[context] = (token, count)
+
+    def is_current(self, storage: Dict[str, str]) -> bool:
+        """
+        True if every context's recorded stamp matches storage (context -> token)
+        and its recorded entry count matches the rows replayed from the log.
+        """
+        with self._lock:
+            if self.rows_missing:
+                return False
+            for context in set(storage) | set(self.stamps) | set(self.order.contexts()):
+                token, count = self.stamps.get(context, (None, 0))
+                if token != storage.get(context) and (context in storage or count):
+                    return False
+                if count != self.order.count(context):
+                    return False
+            return True
+
+    # --- Updates ---
+
+    def set(self, key: EntryKey, vector: np.ndarray):
+        """Store the embedding for an entry, reusing its row if it has one"""
+        with self._lock:
+            self._write(key, vector)
+
+    def add(self, context: str, vector: np.ndarray):
+        """Add an appended text's embedding to the context's last entry"""
+        with self._lock:
+            key = self.order.last(context)
+            row = self.rows.get(key)
+            if row is not None:
+                vector = self.matrix[row].astype(np.float32) + vector
+            self._write(key, vector)
+
+    def remove(self, key: EntryKey):
+        with self._lock:
+            row = self.rows.pop(key, None)
+            if row is None:
+                return
+            self.matrix[row] = 0
+            self.norms[row] = 0.0
+            self.keys[row] = None
+            self.row_contexts[row] = -1
+            self.free.append(row)
+            self.order.discard(key)
+            self.matrix.flush()
+            self._log(f"del\t{row}\n")
+
+    def _write(self, key: EntryKey, vector: np.ndarray):
+        row = self.rows.get(key)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = len(self.keys)
+                self.keys.append(None)
+                if row >= self.capacity:
+                    self._grow()
+            self.matrix[row] = vector
+            self.matrix.flush()
+            self.rows[key] = row
+            self.keys[row] = key
+            self.row_contexts[row] = self._context_id(key[0])
+            self.order.add(key)
+            self._log(f"set\t{row}\t{key[0]}\t{key[1] or ''}\n")
+        else:
+            self.matrix[row] = vector
+        self.norms[row] = np.linalg.norm(self.matrix[row].astype(np.float32))
+
+    # --- Queries ---
+
+    def search(self, query: np.ndarray, context: Optional[str] = None, limit: int = 5) -> List[Tuple[EntryKey, float]]:
+        """Top-k entries by cosine similarity to the query embedding"""
+        query_norm = float(np.linalg.norm(query))
+        with self._lock:
+            used = len(self.keys)
+            if not used or query_norm == 0.0:
+                return []
+            query = (query / query_norm).astype(np.float32)
+            scores = np.empty(used, dtype=np.float32)
+            buffer = np.empty((min(used, QUERY_CHUNK_ROWS), self.dim), dtype=np.float32)
+            for start in range(0, used, QUERY_CHUNK_ROWS):
+                end = min(used, start + QUERY_CHUNK_ROWS)
+                chunk = buffer[:end - start]
+                np.copyto(chunk, self.matrix[start:end])
+                np.dot(chunk, query, out=scores[start:end])
+            norms = self.norms[:used]
+            np.divide(scores, norms, out=scores, where=norms > 0)
+            scores[norms == 0] = -np.inf
+            if context is not None:
+                scores[self.row_contexts[:used] != self.context_ids.get(context, -2)] = -np.inf
+
+            k = min(limit, used)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.keys[row], float(scores[row])) for row in top if scores[row] > 0]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def embed_query(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Embed a spoken query, ignoring filler words ("what did I write about ...")"""
+    return embed(text, dim, stopwords=QUERY_STOPWORDS)
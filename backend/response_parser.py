@@ -0,0 +1,85 @@
+import json
+import re
+from typing import Any, Dict
+
+from json_repair import repair_json
+
+# How often each parsing tier produced the result
+PARSE_TIER_COUNTS: Dict[str, int] = {
+    "strict": 0,   # fenced block / whole reply was valid JSON
+    "slice": 0,    # valid JSON between the first '{' and last '}'
+    "repair": 0,   # needed json_repair
+    "failed": 0,
+}
+
+_NON_PRINTABLE = re.compile(r'[^\x20-\x7E\n\r\t]+')
+
+
+def _fenced_body(text: str) -> str:
+    """Return the body of the first ``` fence, or the stripped text if there is none"""
+    start = text.find("```")
+    if start == -1:
+        return text.strip()
+    body_start = text.find("\n", start)
+    if body_start == -1:
+        return text.strip()
+    end = text.find("```", body_start)
+    return text[body_start + 1:end if end != -1 else len(text)].strip()
+
+
+def _as_object(value: Any) -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        raise ValueError(f"Expected a JSON object, got {type(value).__name__}")
+    return value
+
+
+def parse_ai_json(response: str) -> Dict[str, Any]:
+    """
+    Parse the JSON object from an LLM reply, cheapest tier first.
+
+    Well-formed replies are decoded with a single json.loads on the fenced
+    block; only replies that fail that (and a slice between the outermost
+    braces) pay for the non-printable strip and json_repair.
+    """
+    body = _fenced_body(response)
+
+    # Tier 1: strict parse of the fenced block
+    try:
+        data = _as_object(json.loads(body))
+        PARSE_TIER_COUNTS["strict"] += 1
+        return data
+    except ValueError:
+        pass
+
+    # Tier 2: strict parse between the outermost braces (chatter around the JSON)
+    first, last = body.find("{"), body.rfind("}")
+    if first != -1 and last > first:
+        try:
+            data = _as_object(json.loads(body[first:last + 1]))
+            PARSE_TIER_COUNTS["slice"] += 1
+            return data
+        except ValueError:
+            pass
+
+    # Tier 3: clean up and repair
+    cleaned = _NON_PRINTABLE.sub('', response)
+    clean_str = cleaned.replace("```json", "").replace("```", "").strip()
+    try:
+        data = _as_object(json.loads(repair_json(clean_str)))
+        PARSE_TIER_COUNTS["repair"] += 1
+        return data
+    except ValueError:
+        pass
+
+    # Last resort: regex out an object and parse it as-is
+    json_match = re.search(r'\{.*\}', clean_str, re.DOTALL)
+    if json_match:
+        try:
+            data = _as_object(json.loads(json_match.group()))
+            PARSE_TIER_COUNTS["repair"] += 1
+            return data
+        except ValueError:
+            pass
+
+    PARSE_TIER_COUNTS["failed"] += 1
+    raise ValueError("Could not parse JSON from AI response")
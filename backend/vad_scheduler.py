@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+VAD_STATE_SHAPE = (2, 128)  # Silero v5 LSTM state per stream
+
+
+@dataclass
+class VadRequest:
+    """Consecutive frames of one session waiting for their speech probabilities"""
+    session_id: str
+    frames: np.ndarray          # (n_frames, FRAME_SIZE_SAMPLES) float32
+    future: asyncio.Future
+    probs: np.ndarray = None    # filled in wave by wave
+    remaining: int = 0
+
+    def __post_init__(self):
+        self.probs = np.empty(len(self.frames), dtype=np.float32)
+        self.remaining = len(self.frames)
+
+
+class VadScheduler:
+    """
+    Gather pending VAD frames from every open session and score them in
+    one batched Silero forward pass.
+
+    The Silero JIT wrapper keeps a single recurrent state for the whole batch
+    and resets it whenever the batch size changes, so the scheduler calls the
+    inner 16 kHz network directly and keeps each session's LSTM state and
+    audio context itself.
+
+    infer_many() takes all the frames of a WebSocket message in one request.
+    Each frame needs the state the previous one left, so a session's frames
+    still go through successive waves, but the per-frame queueing and
+    future overhead is gone.
+    """
+
+    def __init__(self, model, sample_rate: int = 16000,
+                 max_batch_size: int = 128, max_wait_ms: float = 5.0,
+                 executor=None):
+        if sample_rate != 16000:
+            raise ValueError(f"Batched VAD only supports 16000 Hz, got {sample_rate}")
+
+        self.net = model._model
+        self.context_size = self.net.context_size_samples
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor  # InferenceExecutor; None runs inline
+
+        self.states: Dict[str, torch.Tensor] = {}
+        self.contexts: Dict[str, torch.Tensor] = {}
+        self.queue: asyncio.Queue = None
+        self.task: asyncio.Task = None
+
+        # Metrics
+        self.frames_processed = 0
+        self.batches_processed = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+        logger.info(
+            f"VAD scheduler started (max_batch={self.max_batch_size}, "
+            f"max_wait={self.max_wait * 1000:.1f}ms)"
+        )
+
+    async def stop(self):
+        """Stop the batching loop and fail any frames still queued"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        while self.queue and not self.queue.empty():
+            request = self.queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("VAD scheduler stopped"))
+
+    def release(self, session_id: str):
+        """Forget the recurrent state of a closed session"""
+        self.states.pop(session_id, None)
+        self.contexts.pop(session_id, None)
+
+    # --- Public API ---
+
+    async def infer(self, session_id: str, frame: np.ndarray) -> float:
+        """Queue one float32 frame of FRAME_SIZE_SAMPLES and await its speech probability"""
+        probs = await self.infer_many(session_id, frame[np.newaxis])
+        return float(probs[0])
+
+    async def infer_many(self, session_id: str, frames: np.ndarray) -> np.ndarray:
+        """
+        Queue a session's consecutive frames, shape (n_frames, FRAME_SIZE_SAMPLES),
+        and await their speech probabilities as a float32 array. The caller
+        may reuse frames once this returns.
+        """
+        if not len(frames):
+            return np.empty(0, dtype=np.float32)
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(VadRequest(session_id, frames, future))
+        return await future
+
+    @property
+    def average_batch_size(self) -> float:
+        if not self.batches_processed:
+            return 0.0
+        return self.frames_processed / self.batches_processed
+
+    # --- Batching Loop ---
+
+    async def _collect(self) -> List[VadRequest]:
+        """Wait for one frame, then up to max_wait for more"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            # Every known session already has a frame queued; waiting longer
+            # only adds latency.
+            if len(batch) >= max(len(self.states), 1):
+                break
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            # A session's frames must run in order against its own state, so a
+            # batch holding several frames from one session (in one request
+            # or several) is split into waves with at most one frame per
+            # session each.
+            waves: List[List[Tuple[VadRequest, int]]] = []
+            seen: Dict[str, int] = {}
+            for request in batch:
+                start = seen.get(request.session_id, 0)
+                seen[request.session_id] = start + len(request.frames)
+                for k in range(len(request.frames)):
+                    if start + k == len(waves):
+                        waves.append([])
+                    waves[start + k].append((request, k))
+
+            for wave in waves:
+                # Cancelled requests belong to sessions that are going away
+                wave = [(r, k) for r, k in wave if not r.future.done()]
+                if wave:
+                    await self._run_wave(wave)
+
+    async def _run_wave(self, wave: List[Tuple[VadRequest, int]]):
+        """Score a wave of frames and hand each session its probability and new state"""
+        session_ids = [r.session_id for r, _ in wave]
+        contexts = torch.stack([
+            self.contexts.get(sid, torch.zeros(self.context_size))
+            for sid in session_ids
+        ])
+        states = torch.stack([
+            self.states.get(sid, torch.zeros(VAD_STATE_SHAPE))
+            for sid in session_ids
+        ], dim=1)
+        frames = np.stack([r.frames[k] for r, k in wave])
+
+        try:
+            if self.executor is not None:
+                probs, new_states, tails = await self.executor.run_vad(
+                    self.forward, frames, contexts, states
+                )
+            else:
+                probs, new_states, tails = self.forward(frames, contexts, states)
+        except Exception as e:
+            logger.error(f"Batched VAD inference failed: {e}")
+            for request, _ in wave:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        # State is written back on the event loop thread; a cancelled request
+        # belongs to a session that is going away, so its state is dropped.
+        for i, (request, k) in enumerate(wave):
+            if request.future.done():
+                continue
+            self.states[request.session_id] = new_states[:, i].clone()
+            self.contexts[request.session_id] = tails[i].clone()
+            request.probs[k] = probs[i]
+            request.remaining -= 1
+            if not request.remaining:
+                request.future.set_result(request.probs)
+
+        self.frames_processed += len(wave)
+        self.batches_processed += 1
+
+    def forward(self, frames: np.ndarray, contexts: torch.Tensor, states: torch.Tensor):
+        """Run one batched forward pass; returns (probs, new_states, new_contexts)"""
+        x = torch.cat([contexts, torch.from_numpy(frames)], dim=1)
+        with torch.no_grad():
+            out, new_states = self.net(x, states)
+        return out.reshape(len(frames)).numpy(), new_states, x[:, -self.context_size:]
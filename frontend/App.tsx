@@ -126,13 +126,29 @@ function App() {
           setProcessStatus('transcribing');
           break;
 
+        // Interim text while the user is still speaking; replaces the previous partial
+        case 'PARTIAL_TRANSCRIPTION':
+          const partialText = (data.text || '').trim();
+          setTranscripts(prev => {
+            const finals = prev.filter(m => m.isFinal);
+            if (!partialText) return finals;
+            return [...finals, {
+              id: 'partial-' + (data.session_id || ''),
+              text: partialText,
+              sender: 'user',
+              timestamp: data.timestamp ? data.timestamp * 1000 : Date.now(),
+              isFinal: false
+            }];
+          });
+          break;
+
         // User speech converted to text
         case 'TRANSCRIPTION_COMPLETED':
         case 'TRANSCRIPTION':
         case 'USER_TRANSCRIPT':
           const userText = data.text?.trim();
           if (userText) {
-            setTranscripts(prev => [...prev, {
+            setTranscripts(prev => [...prev.filter(m => m.isFinal), {
               id: (data.session_id || '') + Date.now().toString(),
               text: userText,
               sender: 'user',
@@ -517,7 +533,7 @@ function App() {
                   msg.sender === 'user'
                     ? 'bg-primary-600 text-white rounded-tr-sm'
                     : 'bg-white dark:bg-dark-800 border border-gray-100 dark:border-dark-700 text-gray-800 dark:text-gray-100 rounded-tl-sm'
-                }`}>
+                } ${msg.isFinal ? '' : 'opacity-60 italic'}`}>
                   <p className="text-sm leading-relaxed">{msg.text}</p>
                   <span className={`text-[10px] mt-1 block opacity-70 ${msg.sender === 'user' ? 'text-primary-100' : 'text-gray-400'}`}>
                     {new Date(msg.timestamp).toLocaleTimeString()}